@@ -0,0 +1,55 @@
+"""add certificate store
+
+Revision ID: a3f1c2d4e5b6
+Revises:
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a3f1c2d4e5b6'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Databases created by db.create_all() may already have some of these, so each step checks first
+    inspector = sa.inspect(op.get_bind())
+    tables = inspector.get_table_names()
+
+    if 'certificate' not in tables:
+        op.create_table(
+            'certificate',
+            sa.Column('fingerprint_sha256', sa.String(length=64), nullable=False),
+            sa.Column('subject', sa.String(length=255), nullable=True),
+            sa.Column('issuer', sa.String(length=255), nullable=True),
+            sa.Column('valid_from', sa.DateTime(), nullable=True),
+            sa.Column('valid_until', sa.DateTime(), nullable=True),
+            sa.Column('serial_number', sa.String(length=128), nullable=True),
+            sa.Column('version', sa.Integer(), nullable=True),
+            sa.Column('der', sa.LargeBinary(), nullable=True),
+            sa.Column('first_seen', sa.DateTime(), nullable=False),
+            sa.PrimaryKeyConstraint('fingerprint_sha256')
+        )
+
+    if 'scan_result' in tables:
+        columns = [column['name'] for column in inspector.get_columns('scan_result')]
+        if 'cert_fingerprint' not in columns:
+            with op.batch_alter_table('scan_result', schema=None) as batch_op:
+                batch_op.add_column(sa.Column('cert_fingerprint', sa.String(length=64), nullable=True))
+                batch_op.create_index(batch_op.f('ix_scan_result_cert_fingerprint'), ['cert_fingerprint'], unique=False)
+                batch_op.create_foreign_key('fk_scan_result_cert_fingerprint', 'certificate',
+                                            ['cert_fingerprint'], ['fingerprint_sha256'])
+
+
+def downgrade():
+    with op.batch_alter_table('scan_result', schema=None) as batch_op:
+        batch_op.drop_constraint('fk_scan_result_cert_fingerprint', type_='foreignkey')
+        batch_op.drop_index(batch_op.f('ix_scan_result_cert_fingerprint'))
+        batch_op.drop_column('cert_fingerprint')
+
+    op.drop_table('certificate')
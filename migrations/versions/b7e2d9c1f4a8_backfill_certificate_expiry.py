@@ -0,0 +1,126 @@
+"""backfill certificate expiry
+
+Revision ID: b7e2d9c1f4a8
+Revises: a3f1c2d4e5b6
+Create Date: 2026-10-18 11:00:00.000000
+
+"""
+import json
+from datetime import datetime
+from alembic import op
+import sqlalchemy as sa
+from vaultview.utils import get_ist_now
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7e2d9c1f4a8'
+down_revision = 'a3f1c2d4e5b6'
+branch_labels = None
+depends_on = None
+
+scan_result = sa.table(
+    'scan_result',
+    sa.column('id', sa.Integer),
+    sa.column('user_id', sa.Integer),
+    sa.column('domain', sa.String),
+    sa.column('result_type', sa.String),
+    sa.column('result_data', sa.Text),
+    sa.column('cert_fingerprint', sa.String)
+)
+certificate = sa.table(
+    'certificate',
+    sa.column('fingerprint_sha256', sa.String),
+    sa.column('issuer', sa.String),
+    sa.column('valid_until', sa.DateTime)
+)
+certificate_expiry = sa.table(
+    'certificate_expiry',
+    sa.column('user_id', sa.Integer),
+    sa.column('domain', sa.String),
+    sa.column('not_after', sa.DateTime),
+    sa.column('issuer', sa.String),
+    sa.column('cert_fingerprint', sa.String),
+    sa.column('scan_result_id', sa.Integer),
+    sa.column('updated_at', sa.DateTime)
+)
+
+
+def _latest_expiries(bind):
+    """Find the newest successful SSL scan of every user and domain"""
+    latest = {}
+    rows = bind.execute(
+        sa.select(scan_result.c.id, scan_result.c.user_id, scan_result.c.domain, scan_result.c.result_data,
+                  scan_result.c.cert_fingerprint, certificate.c.issuer, certificate.c.valid_until)
+        .select_from(scan_result.outerjoin(
+            certificate, certificate.c.fingerprint_sha256 == scan_result.c.cert_fingerprint))
+        .where(scan_result.c.result_type == 'SSL')
+        .order_by(scan_result.c.id.desc())
+    )
+    for row in rows:
+        key = (row.user_id, row.domain)
+        if key in latest:
+            continue
+
+        if row.valid_until is not None:
+            # Rows written by the certificate store keep the certificate fields in the certificate table
+            not_after, issuer, fingerprint = row.valid_until, row.issuer, row.cert_fingerprint
+        else:
+            # Older rows hold the full SSL result
+            try:
+                data = json.loads(row.result_data)
+                not_after = datetime.fromisoformat(data['valid_until'])
+            except (json.JSONDecodeError, TypeError, KeyError, ValueError):
+                continue
+            issuer, fingerprint = data.get('issuer'), row.cert_fingerprint
+
+        latest[key] = {
+            'not_after': not_after,
+            'issuer': issuer,
+            'cert_fingerprint': fingerprint,
+            'scan_result_id': row.id
+        }
+    return latest
+
+
+def upgrade():
+    bind = op.get_bind()
+    if 'certificate_expiry' not in sa.inspect(bind).get_table_names():
+        op.create_table(
+            'certificate_expiry',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('user_id', sa.Integer(), nullable=False),
+            sa.Column('domain', sa.String(length=255), nullable=False),
+            sa.Column('not_after', sa.DateTime(), nullable=False),
+            sa.Column('issuer', sa.String(length=255), nullable=True),
+            sa.Column('cert_fingerprint', sa.String(length=64), nullable=True),
+            sa.Column('scan_result_id', sa.Integer(), nullable=True),
+            sa.Column('updated_at', sa.DateTime(), nullable=False),
+            sa.ForeignKeyConstraint(['cert_fingerprint'], ['certificate.fingerprint_sha256']),
+            sa.ForeignKeyConstraint(['scan_result_id'], ['scan_result.id']),
+            sa.ForeignKeyConstraint(['user_id'], ['user.id']),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('user_id', 'domain', name='uq_certificate_expiry_user_domain')
+        )
+        op.create_index('ix_certificate_expiry_user_not_after', 'certificate_expiry',
+                        ['user_id', 'not_after'], unique=False)
+
+    # Rows already tracked from a newer scan are left alone
+    existing = {
+        (row.user_id, row.domain): row.scan_result_id
+        for row in bind.execute(sa.select(certificate_expiry.c.user_id, certificate_expiry.c.domain,
+                                          certificate_expiry.c.scan_result_id))
+    }
+    now = get_ist_now()
+    for (user_id, domain), values in _latest_expiries(bind).items():
+        if (user_id, domain) not in existing:
+            bind.execute(certificate_expiry.insert().values(user_id=user_id, domain=domain, updated_at=now, **values))
+        elif (existing[(user_id, domain)] or 0) < values['scan_result_id']:
+            bind.execute(certificate_expiry.update().where(
+                certificate_expiry.c.user_id == user_id,
+                certificate_expiry.c.domain == domain
+            ).values(updated_at=now, **values))
+
+
+def downgrade():
+    op.drop_index('ix_certificate_expiry_user_not_after', table_name='certificate_expiry')
+    op.drop_table('certificate_expiry')
@@ -9,6 +9,14 @@ from vaultview.routes import main
 from vaultview.auth.routes import auth
 from vaultview.db import db
 from vaultview.models import User
+from vaultview import cert_store  # registers the SSL certificate store hooks
+from vaultview.ssl_checker import ssl_probe_engine, DEFAULT_SSL_CONCURRENCY
+from vaultview.dns_cache import configure_resolver, DEFAULT_CACHE_SIZE
+from vaultview.dns_pipeline import bulk_dns_engine
+from vaultview.resolver_pool import configure_resolver_pool
+from vaultview.dnsbl_mirror import dnsbl_mirror
+from vaultview.smtp_cache import smtp_probe_cache, DEFAULT_SMTP_PROBE_TTL
+from vaultview.bulk_processor import bulk_processor
 
 login_manager = LoginManager()
 
@@ -44,6 +52,52 @@ def create_app(*args, **kwargs):
     Migrate(app, db)
     CSRFProtect(app)
     
+    # Configure the shared DNS resolver and its cache
+    configure_resolver(
+        cache_size=app.config.get('DNS_CACHE_SIZE', DEFAULT_CACHE_SIZE),
+        nameservers=app.config.get('DNS_NAMESERVERS'),
+        lifetime=app.config.get('DNS_LIFETIME')
+    )
+    
+    # Spread DNS queries over several upstreams when DNS_UPSTREAMS is set
+    configure_resolver_pool(app.config.get('DNS_UPSTREAMS'), app.config.get('DNS_LIFETIME'))
+    
+    # Configure the pipelined DNS engine used by bulk jobs
+    bulk_dns_engine.configure(
+        nameservers=app.config.get('DNS_NAMESERVERS'),
+        sockets=app.config.get('DNS_BULK_SOCKETS'),
+        lifetime=app.config.get('DNS_LIFETIME')
+    )
+    
+    # Load locally mirrored DNSBL zones ({zone: rbldnsd ip4set file})
+    dnsbl_mirror.configure(app.config.get('DNSBL_MIRRORS'))
+    
+    # Share SMTP test results per MX host for this long (seconds)
+    smtp_probe_cache.configure(app.config.get('SMTP_PROBE_CACHE_TTL', DEFAULT_SMTP_PROBE_TTL))
+    
+    # Worker threads per bulk job and per-scan-type limits, e.g. {'WHOIS': 2};
+    # with adaptive concurrency the limits are ceilings tuned per job from errors and latency.
+    # Jobs are kept in a SQLite database shared by all worker processes
+    bulk_processor.configure(
+        max_workers=app.config.get('BULK_MAX_WORKERS'),
+        scan_concurrency=app.config.get('BULK_SCAN_CONCURRENCY'),
+        adaptive=app.config.get('BULK_ADAPTIVE_CONCURRENCY', True),
+        db_path=app.config.get('BULK_JOB_DB', os.path.join(app.instance_path, 'bulk_jobs.db')),
+        tls_sweep_ports=app.config.get('TLS_SWEEP_PORTS')
+    )
+    
+    # Serving processes pick up bulk jobs interrupted by a restart where they left off and keep
+    # watching for jobs abandoned by other workers. This starts with the first request, so CLI
+    # commands, scripts and the reloader's parent process never take jobs over.
+    if app.config.get('BULK_RESUME_JOBS', True):
+        @app.before_request
+        def start_bulk_recovery():
+            if not bulk_processor.recovery_started:
+                bulk_processor.start_recovery()
+    
+    # Configure SSL probe concurrency
+    ssl_probe_engine.set_concurrency(app.config.get('SSL_PROBE_CONCURRENCY', DEFAULT_SSL_CONCURRENCY))
+    
     # Configure login
     login_manager.login_view = 'auth.login'
     login_manager.login_message = 'Please log in to access this page.'
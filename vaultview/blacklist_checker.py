@@ -1,134 +1,190 @@
 import dns.resolver
+import ipaddress
 import socket
 import json
-from typing import Dict, List, Any
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Dict, List, Any, Callable, Iterator, Optional, Tuple
 from datetime import datetime
+from vaultview.dns_cache import resolve, negative_ttl
+from vaultview.dns_pipeline import bulk_dns_engine
+from vaultview.zone_health import zone_health
+from vaultview.dnsbl_mirror import dnsbl_mirror
+from vaultview.dnsbl_cache import blacklist_cache
 
-def check_blacklist(domain_or_ip: str) -> str:
+# Major DNS blacklists to check, keyed by result name
+DNSBL_ZONES = {
+    'spamhaus_zen': {
+        'name': 'Spamhaus ZEN',
+        'description': 'Combined Spamhaus blocklist',
+        'zone': 'zen.spamhaus.org',
+        'response': '127.0.0.2-127.0.0.11'
+    },
+    'spamhaus_sbl': {
+        'name': 'Spamhaus SBL',
+        'description': 'Spamhaus Block List',
+        'zone': 'sbl.spamhaus.org',
+        'response': '127.0.0.2'
+    },
+    'spamhaus_xbl': {
+        'name': 'Spamhaus XBL',
+        'description': 'Exploits Block List',
+        'zone': 'xbl.spamhaus.org',
+        'response': '127.0.0.4-127.0.0.7'
+    },
+    'spamhaus_pbl': {
+        'name': 'Spamhaus PBL',
+        'description': 'Policy Block List',
+        'zone': 'pbl.spamhaus.org',
+        'response': '127.0.0.10-127.0.0.11'
+    },
+    'sorbs': {
+        'name': 'SORBS',
+        'description': 'Spam and Open Relay Blocking System',
+        'zone': 'dnsbl.sorbs.net',
+        'response': '127.0.0.10'
+    },
+    'barracuda': {
+        'name': 'Barracuda',
+        'description': 'Barracuda Reputation Block List',
+        'zone': 'b.barracudacentral.org',
+        'response': '127.0.0.2'
+    },
+    'spamcop': {
+        'name': 'SpamCop',
+        'description': 'SpamCop Blocking List',
+        'zone': 'bl.spamcop.net',
+        'response': '127.0.0.2'
+    },
+    'dnsbl_abuseat': {
+        'name': 'AbuseAt',
+        'description': 'AbuseAt CBL',
+        'zone': 'cbl.abuseat.org',
+        'response': '127.0.0.2'
+    },
+    'dynip': {
+        'name': 'DynIP',
+        'description': 'Dynamic IP Block List',
+        'zone': 'dynip.rothen.com',
+        'response': '127.0.0.2'
+    },
+    'dnsbl_ahbl': {
+        'name': 'AHBL',
+        'description': 'Abusive Hosts Blocking List',
+        'zone': 'dnsbl.ahbl.org',
+        'response': '127.0.0.10'
+    }
+}
+
+# Overall per-scan deadline in seconds (dnspython's default query lifetime)
+BLACKLIST_DEADLINE = 5.0
+MAX_BLACKLIST_WORKERS = 32
+
+# Largest CIDR range checked by check_blacklist_range (a /22); the check runs
+# synchronously, so bigger ranges are rejected rather than tying up a request
+MAX_RANGE_ADDRESSES = 1024
+# Addresses expanded and queried per batch when scanning a range
+RANGE_BATCH_SIZE = 1024
+
+def check_blacklist(domain_or_ip: str, engine=None) -> str:
     """
-    Check if a domain or IP is listed on major DNS blacklists
+    Check if a domain or IP is listed on major DNS blacklists; bulk jobs pass their pipelined DNS engine
     """
+    # Address ranges get a compact per-range summary instead
+    if '/' in domain_or_ip:
+        return check_blacklist_range(domain_or_ip)
+    
+    # Live zones whose health has not been recorded yet
+    unrecorded = set()
     try:
         # Determine if input is IP or domain
         try:
             socket.inet_aton(domain_or_ip)
             is_ip = True
-            check_value = domain_or_ip
+            ips = [domain_or_ip]
         except socket.error:
             is_ip = False
-            check_value = domain_or_ip
-        
-        # Major DNS blacklists to check
-        blacklists = {
-            'spamhaus_zen': {
-                'name': 'Spamhaus ZEN',
-                'description': 'Combined Spamhaus blocklist',
-                'query': f'{check_value}.zen.spamhaus.org',
-                'response': '127.0.0.2-127.0.0.11'
-            },
-            'spamhaus_sbl': {
-                'name': 'Spamhaus SBL',
-                'description': 'Spamhaus Block List',
-                'query': f'{check_value}.sbl.spamhaus.org',
-                'response': '127.0.0.2'
-            },
-            'spamhaus_xbl': {
-                'name': 'Spamhaus XBL',
-                'description': 'Exploits Block List',
-                'query': f'{check_value}.xbl.spamhaus.org',
-                'response': '127.0.0.4-127.0.0.7'
-            },
-            'spamhaus_pbl': {
-                'name': 'Spamhaus PBL',
-                'description': 'Policy Block List',
-                'query': f'{check_value}.pbl.spamhaus.org',
-                'response': '127.0.0.10-127.0.0.11'
-            },
-            'sorbs': {
-                'name': 'SORBS',
-                'description': 'Spam and Open Relay Blocking System',
-                'query': f'{check_value}.dnsbl.sorbs.net',
-                'response': '127.0.0.10'
-            },
-            'barracuda': {
-                'name': 'Barracuda',
-                'description': 'Barracuda Reputation Block List',
-                'query': f'{check_value}.b.barracudacentral.org',
-                'response': '127.0.0.2'
-            },
-            'spamcop': {
-                'name': 'SpamCop',
-                'description': 'SpamCop Blocking List',
-                'query': f'{check_value}.bl.spamcop.net',
-                'response': '127.0.0.2'
-            },
-            'dnsbl_abuseat': {
-                'name': 'AbuseAt',
-                'description': 'AbuseAt CBL',
-                'query': f'{check_value}.cbl.abuseat.org',
-                'response': '127.0.0.2'
-            },
-            'dynip': {
-                'name': 'DynIP',
-                'description': 'Dynamic IP Block List',
-                'query': f'{check_value}.dynip.rothen.com',
-                'response': '127.0.0.2'
-            },
-            'dnsbl_ahbl': {
-                'name': 'AHBL',
-                'description': 'Abusive Hosts Blocking List',
-                'query': f'{check_value}.dnsbl.ahbl.org',
-                'response': '127.0.0.10'
-            }
-        }
+            # DNSBLs list IP addresses, so a domain is checked through the IPs it resolves to
+            ips = resolve_ipv4_addresses(domain_or_ip, engine)
+            if not ips:
+                return json.dumps({
+                    'error': f'Could not resolve {domain_or_ip} to an IPv4 address for blacklist checks'
+                })
         
         results = {
             'domain_or_ip': domain_or_ip,
             'type': 'IP' if is_ip else 'Domain',
+            'ips': ips,
             'scan_time': datetime.now().isoformat(),
             'blacklists': {},
             'summary': {
-                'total_checked': len(blacklists),
+                'total_checked': len(DNSBL_ZONES),
                 'listed_count': 0,
                 'clean_count': 0,
-                'error_count': 0
+                'error_count': 0,
+                'skipped_count': 0
             }
         }
         
-        # Check each blacklist
-        for bl_key, bl_info in blacklists.items():
+        # IPs in locally mirrored zones are answered from the mirror without any DNS traffic
+        mirrored = {}
+        for bl_key, bl_info in DNSBL_ZONES.items():
+            if dnsbl_mirror.has_zone(bl_info['zone']):
+                mirrored[bl_key] = {ip: lookup_mirror(bl_info['zone'], ip) for ip in ips}
+        
+        # Query every other (IP, zone) pair at once so the scan takes about as long as the slowest
+        # live zone, leaving out zones whose circuit is open after repeated failures
+        live_zones = [
+            bl_key for bl_key in DNSBL_ZONES
+            if bl_key not in mirrored and zone_health.allow(DNSBL_ZONES[bl_key]['zone'])
+        ]
+        unrecorded.update(live_zones)
+        futures = {}
+        if live_zones:
+            executor = ThreadPoolExecutor(max_workers=min(len(live_zones) * len(ips), MAX_BLACKLIST_WORKERS))
             try:
-                # Perform DNS lookup
-                answers = dns.resolver.resolve(bl_info['query'], 'A')
-                listed = True
-                response_ip = str(answers[0])
-                status = 'Listed'
-                
-                # Check if response matches expected blacklist response
-                if response_ip.startswith('127.0.0.'):
-                    status = 'Listed'
+                futures = {
+                    (bl_key, ip): executor.submit(lookup_blacklist_cached, ip, DNSBL_ZONES[bl_key]['zone'],
+                                                  BLACKLIST_DEADLINE, engine)
+                    for bl_key in live_zones
+                    for ip in ips
+                }
+                wait(futures.values(), timeout=BLACKLIST_DEADLINE)
+            finally:
+                executor.shutdown(wait=False)
+        
+        for bl_key, bl_info in DNSBL_ZONES.items():
+            if bl_key in mirrored:
+                ip_results = mirrored[bl_key]
+            elif bl_key not in live_zones:
+                ip_results = {ip: (False, None, 'Skipped (unhealthy)') for ip in ips}
+            else:
+                ip_results = {}
+                for ip in ips:
+                    future = futures[(bl_key, ip)]
+                    if future.done():
+                        ip_results[ip] = future.result()
+                    else:
+                        ip_results[ip] = (False, None,
+                                          f'Error: DNSBL lookup timed out after {BLACKLIST_DEADLINE:g} seconds')
+            
+            listed, response_ip, status = merge_ip_results(ip_results)
+            
+            if bl_key in live_zones:
+                if status.startswith('Error'):
+                    zone_health.record_failure(bl_info['zone'], status)
                 else:
-                    status = 'Unknown Response'
-                    
-            except dns.resolver.NXDOMAIN:
-                listed = False
-                response_ip = None
-                status = 'Clean'
-            except dns.resolver.NoAnswer:
-                listed = False
-                response_ip = None
-                status = 'Clean'
-            except Exception as e:
-                listed = False
-                response_ip = None
-                status = f'Error: {str(e)}'
-                results['summary']['error_count'] += 1
+                    zone_health.record_success(bl_info['zone'])
+                unrecorded.discard(bl_key)
             
             # Update summary counts
             if status == 'Listed':
                 results['summary']['listed_count'] += 1
             elif status == 'Clean':
                 results['summary']['clean_count'] += 1
+            elif status.startswith('Error'):
+                results['summary']['error_count'] += 1
+            elif status == 'Skipped (unhealthy)':
+                results['summary']['skipped_count'] += 1
             
             results['blacklists'][bl_key] = {
                 'name': bl_info['name'],
@@ -136,7 +192,9 @@ def check_blacklist(domain_or_ip: str) -> str:
                 'listed': listed,
                 'status': status,
                 'response_ip': response_ip,
-                'query': bl_info['query']
+                'query': dnsbl_query(ips[0], bl_info['zone']),
+                'listed_ips': [ip for ip, result in ip_results.items() if result[0]],
+                'source': 'mirror' if bl_key in mirrored else 'dns'
             }
         
         # Determine overall status
@@ -153,13 +211,250 @@ def check_blacklist(domain_or_ip: str) -> str:
         return json.dumps({
             'error': f'Unexpected error checking blacklists for {domain_or_ip}: {str(e)}'
         })
+    finally:
+        _release_unrecorded(unrecorded)
+
+def check_blacklist_range(cidr: str) -> str:
+    """
+    Check every address of an IPv4 CIDR range against the DNSBLs, returning listed IPs per zone
+    """
+    unrecorded = set()
+    try:
+        try:
+            network = ipaddress.IPv4Network(cidr.strip(), strict=False)
+        except ValueError as e:
+            return json.dumps({'error': f'Invalid CIDR range {cidr}: {str(e)}'})
+        if network.num_addresses > MAX_RANGE_ADDRESSES:
+            return json.dumps({
+                'error': f'CIDR range {cidr} is too large ({network.num_addresses} addresses, '
+                         f'at most {MAX_RANGE_ADDRESSES} allowed, i.e. a /22); split it into smaller ranges'
+            })
+        
+        zone_results = {
+            bl_key: {'listed_ips': {}, 'errors': 0, 'first_error': None}
+            for bl_key in DNSBL_ZONES
+        }
+        mirrored = [bl_key for bl_key, bl_info in DNSBL_ZONES.items() if dnsbl_mirror.has_zone(bl_info['zone'])]
+        live_zones = [
+            bl_key for bl_key in DNSBL_ZONES
+            if bl_key not in mirrored and zone_health.allow(DNSBL_ZONES[bl_key]['zone'])
+        ]
+        unrecorded.update(live_zones)
+        
+        addresses_checked = 0
+        for batch in _address_batches(network, RANGE_BATCH_SIZE):
+            addresses_checked += len(batch)
+            
+            for bl_key in mirrored:
+                for ip, answer in dnsbl_mirror.lookup_many(DNSBL_ZONES[bl_key]['zone'], batch).items():
+                    zone_results[bl_key]['listed_ips'][ip] = answer[0]
+            
+            # Put the whole batch in flight on the pipelined engine, skipping cached pairs
+            pending = []
+            for bl_key in live_zones:
+                zone = DNSBL_ZONES[bl_key]['zone']
+                for ip in batch:
+                    cached = blacklist_cache.get(ip, zone)
+                    if cached is not None:
+                        _record_range_result(zone_results[bl_key], ip, cached)
+                    else:
+                        future = bulk_dns_engine.submit(dnsbl_query(ip, zone), 'A', BLACKLIST_DEADLINE)
+                        pending.append((bl_key, zone, ip, future))
+            
+            for bl_key, zone, ip, future in pending:
+                result, ttl = blacklist_answer(future.result)
+                blacklist_cache.put(ip, zone, result, ttl)
+                _record_range_result(zone_results[bl_key], ip, result)
+        
+        results = {
+            'domain_or_ip': str(network),
+            'type': 'CIDR',
+            'addresses_checked': addresses_checked,
+            'scan_time': datetime.now().isoformat(),
+            'blacklists': {},
+            'summary': {
+                'total_checked': len(DNSBL_ZONES),
+                'listed_count': 0,
+                'clean_count': 0,
+                'error_count': 0,
+                'skipped_count': 0,
+                'listed_addresses': 0
+            }
+        }
+        
+        listed_addresses = set()
+        for bl_key, bl_info in DNSBL_ZONES.items():
+            zone_result = zone_results[bl_key]
+            listed_ips = zone_result['listed_ips']
+            listed_addresses.update(listed_ips)
+            
+            if bl_key not in mirrored and bl_key not in live_zones:
+                status = 'Skipped (unhealthy)'
+            elif listed_ips:
+                status = 'Listed'
+            elif zone_result['errors']:
+                status = zone_result['first_error']
+            else:
+                status = 'Clean'
+            
+            # A zone that failed for every address counts against its health
+            if bl_key in live_zones:
+                if zone_result['errors'] == addresses_checked:
+                    zone_health.record_failure(bl_info['zone'], zone_result['first_error'])
+                else:
+                    zone_health.record_success(bl_info['zone'])
+                unrecorded.discard(bl_key)
+            
+            if status == 'Listed':
+                results['summary']['listed_count'] += 1
+            elif status == 'Clean':
+                results['summary']['clean_count'] += 1
+            elif status.startswith('Error'):
+                results['summary']['error_count'] += 1
+            else:
+                results['summary']['skipped_count'] += 1
+            
+            results['blacklists'][bl_key] = {
+                'name': bl_info['name'],
+                'description': bl_info['description'],
+                'listed': bool(listed_ips),
+                'status': status,
+                'response_ip': next(iter(listed_ips.values()), None),
+                'listed_ip_count': len(listed_ips),
+                'listed_ips': sorted(listed_ips, key=lambda ip: socket.inet_aton(ip)),
+                'error_count': zone_result['errors'],
+                'source': 'mirror' if bl_key in mirrored else 'dns'
+            }
+        
+        results['summary']['listed_addresses'] = len(listed_addresses)
+        
+        # Determine overall status
+        if results['summary']['listed_count'] > 0:
+            results['overall_status'] = 'Listed'
+            results['severity'] = 'High' if results['summary']['listed_count'] > 3 else 'Medium'
+        else:
+            results['overall_status'] = 'Clean'
+            results['severity'] = 'Low'
+        
+        return json.dumps(results, indent=2)
+        
+    except Exception as e:
+        return json.dumps({
+            'error': f'Unexpected error checking blacklists for {cidr}: {str(e)}'
+        })
+    finally:
+        _release_unrecorded(unrecorded)
+
+def _release_unrecorded(bl_keys):
+    """
+    Count zones let through by zone_health.allow() whose result was never recorded (the check
+    raised part-way) as failed, so a half-open circuit is not left waiting for its trial
+    """
+    for bl_key in bl_keys:
+        zone_health.record_failure(DNSBL_ZONES[bl_key]['zone'], 'Error: check aborted before the zone answered')
+
+def _address_batches(network: ipaddress.IPv4Network, size: int) -> Iterator[List[str]]:
+    """Expand a network lazily into batches of address strings (hosts only, except for /31 and /32)"""
+    addresses = network.hosts() if network.prefixlen < 31 else iter(network)
+    batch = []
+    for address in addresses:
+        batch.append(str(address))
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def _record_range_result(zone_result: Dict[str, Any], ip: str, result: Tuple[bool, Optional[str], str]):
+    """Fold one address's result into a zone's range summary"""
+    listed, response_ip, status = result
+    if listed:
+        zone_result['listed_ips'][ip] = response_ip
+    elif status.startswith('Error'):
+        zone_result['errors'] += 1
+        zone_result['first_error'] = zone_result['first_error'] or status
+
+def resolve_ipv4_addresses(domain: str, engine=None) -> List[str]:
+    """
+    Resolve the IPv4 addresses of a domain (empty if it has none)
+    """
+    try:
+        return sorted({str(answer) for answer in resolve(domain, 'A', engine=engine)})
+    except Exception:
+        return []
+
+def dnsbl_query(ip: str, zone: str) -> str:
+    """
+    Build the DNSBL query name for an IPv4 address: octets reversed, then the zone
+    """
+    return '.'.join(reversed(ip.split('.'))) + '.' + zone
+
+def merge_ip_results(ip_results: Dict[str, Tuple[bool, Optional[str], str]]) -> Tuple[bool, Optional[str], str]:
+    """
+    Combine the results of every IP of a domain on one zone: listed if any IP is listed
+    """
+    results = list(ip_results.values())
+    for result in results:
+        if result[0]:
+            return result
+    for result in results:
+        if result[2].startswith('Error'):
+            return result
+    return results[0]
+
+def lookup_blacklist_cached(ip: str, zone: str, lifetime: float = BLACKLIST_DEADLINE,
+                            engine=None) -> Tuple[bool, Optional[str], str]:
+    """
+    Look up an IP on a zone, sharing cached and in-flight results between domains on the same IP
+    """
+    return blacklist_cache.lookup(ip, zone, lambda: lookup_blacklist(dnsbl_query(ip, zone), lifetime,
+                                                                     with_ttl=True, engine=engine))
+
+def lookup_blacklist(query: str, lifetime: float = BLACKLIST_DEADLINE, with_ttl: bool = False, engine=None):
+    """
+    Look up one DNSBL query, returning (listed, response_ip, status), plus the answer TTL if with_ttl
+    """
+    result, ttl = blacklist_answer(lambda: resolve(query, 'A', engine=engine, lifetime=lifetime))
+    return (result, ttl) if with_ttl else result
+
+def blacklist_answer(fetch: Callable[[], Any]) -> Tuple[Tuple[bool, Optional[str], str], float]:
+    """
+    Turn a DNSBL answer (or the exception raised fetching it) into ((listed, response_ip, status), ttl)
+    """
+    try:
+        answers = fetch()
+        response_ip = str(answers[0])
+        
+        # Check if response matches expected blacklist response
+        if response_ip.startswith('127.0.0.'):
+            return (True, response_ip, 'Listed'), answers.rrset.ttl
+        return (True, response_ip, 'Unknown Response'), answers.rrset.ttl
+    except dns.resolver.NXDOMAIN as e:
+        return (False, None, 'Clean'), negative_ttl(next(iter(e.responses().values()), None))
+    except dns.resolver.NoAnswer as e:
+        return (False, None, 'Clean'), negative_ttl(e.kwargs.get('response'))
+    except Exception as e:
+        # Errors are never cached
+        return (False, None, f'Error: {str(e)}'), 0
+
+def lookup_mirror(zone: str, ip: str) -> Tuple[bool, Optional[str], str]:
+    """
+    Look up an IP in a locally mirrored zone, returning (listed, response_ip, status)
+    """
+    try:
+        answer = dnsbl_mirror.lookup(zone, ip)
+    except ValueError as e:
+        return False, None, f'Error: {str(e)}'
+    if answer is None:
+        return False, None, 'Clean'
+    return True, answer[0], 'Listed'
 
 def get_blacklist_info() -> Dict[str, Any]:
     """
     Get information about available blacklists
     """
     return {
-        'total_blacklists': 10,
+        'total_blacklists': len(DNSBL_ZONES),
         'categories': {
             'spam': ['Spamhaus ZEN', 'Spamhaus SBL', 'Spamhaus XBL', 'Spamhaus PBL', 'SORBS', 'SpamCop'],
             'security': ['Barracuda', 'AbuseAt', 'AHBL'],
@@ -10,38 +10,88 @@ import pandas as pd
 from io import StringIO
 import uuid
 import socket
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from vaultview.concurrency_controller import AIMDController, is_overload_error
+from vaultview.dns_pipeline import bulk_dns_engine
+from vaultview.job_store import JobStore, job_store, HEARTBEAT_INTERVAL, LEASE_TIMEOUT
+
+# Worker threads per bulk job
+DEFAULT_BULK_WORKERS = 32
+# Most scans of each type a job runs at once; slow or rate-limited checks get fewer slots
+DEFAULT_SCAN_CONCURRENCY = {
+    'SSL': 32,
+    'SSL_ADDRESSES': 8,
+    'TLS_SWEEP': 4,
+    'DNS': 32,
+    'WHOIS': 4,
+    'BLACKLIST': 16,
+    'EMAIL': 8
+}
+DEFAULT_SCAN_LIMIT = 8
+# Tasks a worker claims from the job store at a time, per scan type
+CLAIM_BATCH_SIZE = 64
 
 class BulkProcessor:
     """Handles bulk domain processing and batch scanning"""
     
-    def __init__(self):
+    def __init__(self, store: Optional[JobStore] = None):
+        # Jobs live in the shared job store; this only holds state of jobs running in this process
+        self.store = store or job_store
         self.jobs = {}
         self.is_processing = False
+        self.max_workers = DEFAULT_BULK_WORKERS
+        self.scan_concurrency = dict(DEFAULT_SCAN_CONCURRENCY)
+        self.adaptive = True
+        self.tls_sweep_ports = None
+        self.worker_id = f'{socket.gethostname()}:{os.getpid()}'
+        self.started_at = time.time()
+        self.recovery_started = False
+        self._lock = threading.Lock()
+    
+    def configure(self, max_workers: Optional[int] = None, scan_concurrency: Optional[Dict[str, int]] = None,
+                  adaptive: Optional[bool] = None, db_path: Optional[str] = None,
+                  tls_sweep_ports: Optional[List[int]] = None):
+        """
+        Set the worker threads per job, the per-scan-type concurrency limits, the job
+        database and the ports of TLS_SWEEP scans. With adaptive concurrency the limits are ceilings that each job approaches
+        while scans stay healthy.
+        """
+        if adaptive is not None:
+            self.adaptive = adaptive
+        if max_workers:
+            self.max_workers = max_workers
+        if scan_concurrency:
+            self.scan_concurrency.update({scan_type.upper(): limit for scan_type, limit in scan_concurrency.items()})
+        self.store.configure(db_path)
+        if tls_sweep_ports:
+            self.tls_sweep_ports = list(tls_sweep_ports)
     
     def create_job(self, domains: List[str], scan_types: List[str], user_id: int, save_results: bool = True, send_notifications: bool = True) -> str:
         """Create a new bulk processing job"""
         job_id = str(uuid.uuid4())
+        scan_types = list(dict.fromkeys(scan_types))
         
         job = {
             'id': job_id,
             'user_id': user_id,
-            'domains': domains,
             'scan_types': scan_types,
             'total_domains': len(domains),
             'total_scans': len(domains) * len(scan_types),
             'completed_scans': 0,
             'failed_scans': 0,
-            'results': [],
             'status': 'pending',
             'created_at': datetime.now().isoformat(),
             'started_at': None,
             'completed_at': None,
-            'progress_callback': None,
             'save_results': save_results,
-            'send_notifications': send_notifications
+            'send_notifications': send_notifications,
+            # Leased to this process from the start, so no other process resumes it meanwhile
+            'worker': self.worker_id,
+            'heartbeat_at': time.time()
         }
         
-        self.jobs[job_id] = job
+        self.store.create_job(job, domains)
         
         # Start processing immediately
         self.start_job(job_id)
@@ -50,180 +100,352 @@ class BulkProcessor:
     
     def start_job(self, job_id: str, progress_callback: Optional[Callable] = None):
         """Start processing a bulk job"""
-        if job_id not in self.jobs:
+        if self.store.get_status(job_id) is None:
             raise ValueError(f"Job {job_id} not found")
         
-        job = self.jobs[job_id]
-        job['status'] = 'processing'
-        job['started_at'] = datetime.now().isoformat()
-        job['progress_callback'] = progress_callback
+        # Jobs are created leased to this process; one cancelled or taken over meanwhile stays as it is
+        if not self.store.transition(
+            job_id, ('pending', 'processing'), holder=self.worker_id, status='processing',
+            started_at=datetime.now().isoformat(), heartbeat_at=time.time()
+        ):
+            raise ValueError(f"Job {job_id} is no longer pending under this process")
+        self._launch(job_id, progress_callback)
+    
+    def resume_interrupted_jobs(self) -> List[str]:
+        """
+        Resume unfinished jobs whose process stopped (e.g. after a restart). Scans already
+        checkpointed in the job store are not repeated. Returns the resumed job IDs.
+        """
+        resumed = []
+        lease_expiry = time.time() - LEASE_TIMEOUT
+        for candidate in self.store.get_unfinished_jobs():
+            job_id = candidate['id']
+            if job_id in self.jobs:
+                continue
+            
+            gone = self._worker_is_gone(candidate['worker'], candidate['heartbeat_at'])
+            previous_worker = candidate['worker'] if gone else None
+            expired = candidate['heartbeat_at'] is None or candidate['heartbeat_at'] < lease_expiry
+            if not (expired or previous_worker):
+                continue
+            if not self.store.acquire_job(job_id, self.worker_id, previous_worker):
+                continue  # Another process got there first
+            
+            job = self.store.get_job(job_id)
+            if not self.store.transition(job_id, ('pending', 'processing'), holder=self.worker_id, status='processing',
+                                         started_at=job['started_at'] or datetime.now().isoformat()):
+                continue  # Cancelled or taken over since we acquired it
+            print(f"Resuming bulk job {job_id}: {job['completed_scans']}/{job['total_scans']} scans already done")
+            self._launch(job_id)
+            resumed.append(job_id)
+        return resumed
+    
+    def _worker_is_gone(self, worker: Optional[str], heartbeat_at: Optional[float]) -> bool:
+        """
+        Check whether a lease holder on this host has exited, so its jobs need not wait
+        for the lease to expire. A lease under our own ID renewed before this process
+        started was left by an earlier process with the same PID (e.g. in a container).
+        """
+        if not worker:
+            return False
+        if worker == self.worker_id:
+            return heartbeat_at is None or heartbeat_at < self.started_at
+        hostname, _, pid = worker.rpartition(':')
+        if hostname != socket.gethostname() or not pid.isdigit():
+            return False
+        try:
+            os.kill(int(pid), 0)
+        except ProcessLookupError:
+            return True
+        except OSError:
+            return False
+        return False
+    
+    def start_recovery(self):
+        """
+        Resume interrupted jobs and start the recovery monitor, once per process. Only
+        processes that serve requests should call this, so CLI commands never take jobs over.
+        """
+        with self._lock:
+            if self.recovery_started:
+                return
+            self.recovery_started = True
+        try:
+            self.resume_interrupted_jobs()
+        except Exception as e:
+            # The monitor retries shortly
+            print(f"Error resuming interrupted bulk jobs: {e}")
+        self.start_recovery_monitor()
+    
+    def start_recovery_monitor(self, interval: float = LEASE_TIMEOUT / 2):
+        """Periodically resume jobs abandoned by other processes (e.g. a crashed worker on another host)"""
+        def monitor():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.resume_interrupted_jobs()
+                except Exception as e:
+                    print(f"Error resuming interrupted bulk jobs: {e}")
+        
+        thread = threading.Thread(target=monitor, daemon=True)
+        thread.start()
+    
+    def _launch(self, job_id: str, progress_callback: Optional[Callable] = None):
+        self.jobs[job_id] = {
+            'progress_callback': progress_callback,
+            'concurrency': {}
+        }
         
         # Start processing in background thread
         thread = threading.Thread(target=self._process_job, args=(job_id,), daemon=True)
         thread.start()
     
     def _process_job(self, job_id: str):
-        """Process a bulk job in the background"""
-        job = self.jobs[job_id]
+        """Process a bulk job in the background on a pool of worker threads"""
+        job = self.store.get_job(job_id)
+        runtime = self.jobs[job_id]
+        
+        # DNS-based scans of the job are handed the pipelined engine explicitly
+        bulk_dns_engine.start()
+        executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        running = {}
         
         try:
-            for domain in job['domains']:
-                if job['status'] == 'cancelled':
+            # Tasks are claimed from the store in batches into one local queue per scan type,
+            # each drained up to that type's concurrency limit
+            queues = {scan_type: deque() for scan_type in job['scan_types']}
+            exhausted = set()
+            controllers = {
+                scan_type: AIMDController(self._scan_limit(scan_type), adaptive=self.adaptive)
+                for scan_type in job['scan_types']
+            }
+            runtime['concurrency'] = controllers
+            lease_lost = False
+            last_heartbeat = time.monotonic()
+            
+            while True:
+                if self.store.get_status(job_id) == 'cancelled':
                     break
                 
-                domain_results = {
-                    'domain': domain,
-                    'scans': {},
-                    'status': 'completed',
-                    'errors': []
-                }
-                
-                for scan_type in job['scan_types']:
-                    if job['status'] == 'cancelled':
+                if time.monotonic() - last_heartbeat >= HEARTBEAT_INTERVAL:
+                    last_heartbeat = time.monotonic()
+                    if not self.store.heartbeat(job_id, self.worker_id):
+                        print(f"Bulk job {job_id} was taken over by another process; stopping here")
+                        lease_lost = True
                         break
+                
+                for scan_type, queue in queues.items():
+                    if not queue and scan_type not in exhausted:
+                        queue.extend(self.store.claim_tasks(job_id, scan_type, CLAIM_BATCH_SIZE, self.worker_id))
+                        if not queue:
+                            exhausted.add(scan_type)
+                if not running and not any(queues.values()):
+                    break
+                
+                # Hand out worker slots round-robin across scan types
+                dispatched = True
+                while dispatched and len(running) < self.max_workers:
+                    dispatched = False
+                    for scan_type, queue in queues.items():
+                        if len(running) >= self.max_workers:
+                            break
+                        if not queue or not controllers[scan_type].try_acquire():
+                            continue
+                        index, domain = queue.popleft()
+                        future = executor.submit(self._run_scan, domain, scan_type)
+                        running[future] = (index, domain, scan_type, time.monotonic())
+                        dispatched = True
+                
+                # Wake up periodically so a cancellation is noticed while scans are slow
+                done, _ = wait(running, timeout=1.0, return_when=FIRST_COMPLETED)
+                completions = []
+                for future in done:
+                    index, domain, scan_type, started = running.pop(future)
                     
+                    failed = False
                     try:
-                        # Import scan functions dynamically
-                        if scan_type == 'SSL':
-                            from vaultview.ssl_checker import check_ssl
-                            result = check_ssl(domain)
-                            # Parse JSON result
-                            try:
-                                ssl_data = json.loads(result)
-                                domain_results['scans'][scan_type] = {
-                                    'status': 'success',
-                                    'data': ssl_data
-                                }
-                            except:
-                                domain_results['scans'][scan_type] = {
-                                    'status': 'success',
-                                    'data': result
-                                }
-                        elif scan_type == 'DNS':
-                            from vaultview.dns_checker import check_dns
-                            result = check_dns(domain)
-                            # Parse JSON result
-                            try:
-                                dns_data = json.loads(result)
-                                domain_results['scans'][scan_type] = {
-                                    'status': 'success',
-                                    'data': dns_data
-                                }
-                            except:
-                                domain_results['scans'][scan_type] = {
-                                    'status': 'success',
-                                    'data': result
-                                }
-                        elif scan_type == 'WHOIS':
-                            import whois
-                            
-                            # Set timeout for WHOIS query
-                            original_timeout = socket.getdefaulttimeout()
-                            socket.setdefaulttimeout(10)  # 10 second timeout
-                            
-                            try:
-                                whois_data = whois.whois(domain)
-                                
-                                # Restore original timeout
-                                socket.setdefaulttimeout(original_timeout)
-                                
-                                whois_result = {
-                                    'domain': whois_data.domain if whois_data.domain else domain,
-                                    'registrar': whois_data.registrar if whois_data.registrar else 'N/A',
-                                    'creation_date': str(whois_data.creation_date) if whois_data.creation_date else 'N/A',
-                                    'expiration_date': str(whois_data.expiration_date) if whois_data.expiration_date else 'N/A',
-                                    'updated_date': str(whois_data.updated_date) if whois_data.updated_date else 'N/A',
-                                    'status': whois_data.status if whois_data.status else 'N/A',
-                                    'name_servers': whois_data.name_servers if whois_data.name_servers else 'N/A',
-                                    'emails': whois_data.emails if whois_data.emails else 'N/A',
-                                    'raw': str(whois_data.text)[:1000] if whois_data.text else 'No raw data available'
-                                }
-                                
-                                domain_results['scans'][scan_type] = {
-                                    'status': 'success',
-                                    'data': whois_result
-                                }
-                            except Exception as whois_error:
-                                # Restore original timeout
-                                socket.setdefaulttimeout(original_timeout)
-                                raise Exception(f"WHOIS lookup failed: {str(whois_error)}")
-                        elif scan_type.upper() == 'BLACKLIST':
-                            from vaultview.blacklist_checker import check_blacklist
-                            result = check_blacklist(domain)
-                            # Parse JSON result
-                            try:
-                                blacklist_data = json.loads(result)
-                                domain_results['scans'][scan_type] = {
-                                    'status': 'success',
-                                    'data': blacklist_data
-                                }
-                            except:
-                                domain_results['scans'][scan_type] = {
-                                    'status': 'success',
-                                    'data': result
-                                }
-                        elif scan_type.upper() == 'EMAIL':
-                            from vaultview.email_checker import check_email
-                            result = check_email(domain)
-                            # Parse JSON result
-                            try:
-                                email_data = json.loads(result)
-                                domain_results['scans'][scan_type] = {
-                                    'status': 'success',
-                                    'data': email_data
-                                }
-                            except:
-                                domain_results['scans'][scan_type] = {
-                                    'status': 'success',
-                                    'data': result
-                                }
-                        else:
-                            raise ValueError(f"Unknown scan type: {scan_type}")
-                        
+                        scan_result = future.result()
+                        # Checkers report timeouts inside their JSON rather than raising
+                        overloaded = any(is_overload_error(error)
+                                         for error in scan_errors(scan_type, scan_result.get('data')))
                     except Exception as e:
-                        domain_results['scans'][scan_type] = {
+                        scan_result = {
                             'status': 'error',
                             'error': str(e)
                         }
-                        domain_results['errors'].append(f"{scan_type}: {str(e)}")
-                        job['failed_scans'] += 1
+                        failed = True
+                        overloaded = is_overload_error(str(e))
                     
-                    job['completed_scans'] += 1
-                    
-                    # Update progress
-                    if job['progress_callback']:
-                        progress = (job['completed_scans'] / job['total_scans']) * 100
-                        job['progress_callback'](progress, job['completed_scans'], job['total_scans'])
-                    
-                    # Small delay to prevent overwhelming
-                    time.sleep(0.1)
+                    controllers[scan_type].release(started, overloaded)
+                    completions.append((index, scan_type, scan_result, failed))
                 
-                job['results'].append(domain_results)
+                if not completions:
+                    continue
                 
-                # Check if domain has errors
-                if domain_results['errors']:
-                    domain_results['status'] = 'partial'
+                # Checkpoint results and job counters in one transaction per batch
+                completed, _ = self.store.complete_tasks(
+                    job_id, completions, datetime.now().isoformat(), self.worker_id,
+                    concurrency={scan_type: controller.get_status() for scan_type, controller in controllers.items()}
+                )
                 
-            job['status'] = 'completed'
-            job['completed_at'] = datetime.now().isoformat()
+                # Update progress
+                if runtime['progress_callback']:
+                    for done_scans in range(completed - len(completions) + 1, completed + 1):
+                        progress = (done_scans / job['total_scans']) * 100
+                        runtime['progress_callback'](progress, done_scans, job['total_scans'])
+            
+            if not lease_lost:
+                self.store.transition(job_id, ('processing',), holder=self.worker_id,
+                                      status='completed', completed_at=datetime.now().isoformat())
             
         except Exception as e:
-            job['status'] = 'failed'
-            job['error'] = str(e)
-            job['completed_at'] = datetime.now().isoformat()
+            # Leave a cancelled job, or one another process has taken over, as it is
+            try:
+                self.store.transition(job_id, ('processing',), holder=self.worker_id,
+                                      status='failed', error=str(e), completed_at=datetime.now().isoformat())
+            except Exception as store_error:
+                print(f"Could not mark bulk job {job_id} as failed: {store_error}")
+        finally:
+            # Drop scans still queued for a cancelled or failed job
+            # (shutdown(cancel_futures=True) needs Python 3.9)
+            for future in running:
+                future.cancel()
+            executor.shutdown(wait=False)
+            try:
+                self.store.release_tasks(job_id, self.worker_id)
+            except Exception as e:
+                print(f"Could not release unfinished tasks of bulk job {job_id}: {e}")
+            self.jobs.pop(job_id, None)
+    
+    def _scan_limit(self, scan_type: str) -> int:
+        """Scans of this type a job may run at once"""
+        return max(1, self.scan_concurrency.get(scan_type.upper(), DEFAULT_SCAN_LIMIT))
+    
+    def _run_scan(self, domain: str, scan_type: str) -> Dict[str, Any]:
+        """Run one scan of a domain, returning its result entry; raises on failure"""
+        # Import scan functions dynamically
+        if scan_type == 'SSL':
+            from vaultview.ssl_checker import ssl_probe_engine
+            # Submitted only once dispatched, so the SSL concurrency limit applies to the handshake
+            result = ssl_probe_engine.submit(domain).result()
+            # Parse JSON result
+            try:
+                ssl_data = json.loads(result)
+                return {
+                    'status': 'success',
+                    'data': ssl_data
+                }
+            except:
+                return {
+                    'status': 'success',
+                    'data': result
+                }
+        elif scan_type == 'SSL_ADDRESSES':
+            from vaultview.ssl_checker import check_ssl_all_addresses
+            result = check_ssl_all_addresses(domain)
+            return {
+                'status': 'success',
+                'data': json.loads(result)
+            }
+        elif scan_type == 'TLS_SWEEP':
+            from vaultview.ssl_checker import check_tls_sweep
+            result = check_tls_sweep(domain, self.tls_sweep_ports)
+            return {
+                'status': 'success',
+                'data': json.loads(result)
+            }
+        elif scan_type == 'DNS':
+            from vaultview.dns_checker import check_dns
+            result = check_dns(domain, engine=bulk_dns_engine)
+            # Parse JSON result
+            try:
+                dns_data = json.loads(result)
+                return {
+                    'status': 'success',
+                    'data': dns_data
+                }
+            except:
+                return {
+                    'status': 'success',
+                    'data': result
+                }
+        elif scan_type == 'WHOIS':
+            from vaultview.whois_checker import lookup_whois
+            
+            try:
+                whois_data = lookup_whois(domain)
+                
+                whois_result = {
+                    'domain': whois_data.domain if whois_data.domain else domain,
+                    'registrar': whois_data.registrar if whois_data.registrar else 'N/A',
+                    'creation_date': str(whois_data.creation_date) if whois_data.creation_date else 'N/A',
+                    'expiration_date': str(whois_data.expiration_date) if whois_data.expiration_date else 'N/A',
+                    'updated_date': str(whois_data.updated_date) if whois_data.updated_date else 'N/A',
+                    'status': whois_data.status if whois_data.status else 'N/A',
+                    'name_servers': whois_data.name_servers if whois_data.name_servers else 'N/A',
+                    'emails': whois_data.emails if whois_data.emails else 'N/A',
+                    'raw': str(whois_data.text)[:1000] if whois_data.text else 'No raw data available'
+                }
+                
+                return {
+                    'status': 'success',
+                    'data': whois_result
+                }
+            except Exception as whois_error:
+                raise Exception(f"WHOIS lookup failed: {str(whois_error)}")
+        elif scan_type.upper() == 'BLACKLIST':
+            from vaultview.blacklist_checker import check_blacklist
+            result = check_blacklist(domain, engine=bulk_dns_engine)
+            # Parse JSON result
+            try:
+                blacklist_data = json.loads(result)
+                return {
+                    'status': 'success',
+                    'data': blacklist_data
+                }
+            except:
+                return {
+                    'status': 'success',
+                    'data': result
+                }
+        elif scan_type.upper() == 'EMAIL':
+            from vaultview.email_checker import check_email
+            result = check_email(domain, engine=bulk_dns_engine)
+            # Parse JSON result
+            try:
+                email_data = json.loads(result)
+                return {
+                    'status': 'success',
+                    'data': email_data
+                }
+            except:
+                return {
+                    'status': 'success',
+                    'data': result
+                }
+        else:
+            raise ValueError(f"Unknown scan type: {scan_type}")
     
     def get_job_status(self, job_id: str) -> Optional[Dict[str, Any]]:
         """Get the status of a job"""
-        if job_id not in self.jobs:
+        job = self.store.get_job(job_id)
+        if job is None:
             return None
         
-        job = self.jobs[job_id]
-        
         # Calculate progress
         progress = 0
         if job['total_scans'] > 0:
             progress = (job['completed_scans'] / job['total_scans']) * 100
         
+        # Live controllers when the job runs in this process, else the last stored snapshot
+        runtime = self.jobs.get(job_id)
+        concurrency = job['concurrency']
+        if runtime and runtime['concurrency']:
+            concurrency = {
+                scan_type: controller.get_status()
+                for scan_type, controller in runtime['concurrency'].items()
+            }
+        
         return {
             'id': job['id'],
             'status': job['status'],
@@ -234,25 +456,26 @@ class BulkProcessor:
             'created_at': job['created_at'],
             'started_at': job['started_at'],
             'completed_at': job['completed_at'],
-            'error': job.get('error')
+            'error': job.get('error'),
+            'concurrency': concurrency
         }
     
     def get_results(self, job_id: str) -> Optional[Dict[str, Any]]:
-        """Get the results of a completed job"""
-        if job_id not in self.jobs:
+        """Get the results of a finished job; a cancelled job has the scans done before it stopped"""
+        job = self.store.get_job(job_id)
+        if job is None:
             return None
         
-        job = self.jobs[job_id]
-        
-        if job['status'] not in ['completed', 'failed']:
+        if job['status'] not in ['completed', 'failed', 'cancelled']:
             return None
         
+        results = self.store.get_domain_results(job_id)
         return {
             'id': job['id'],
             'user_id': job['user_id'],
             'status': job['status'],
-            'results': job['results'],
-            'summary': self._generate_summary(job['results']),
+            'results': results,
+            'summary': self._generate_summary(results),
             'created_at': job['created_at'],
             'started_at': job['started_at'],
             'completed_at': job['completed_at']
@@ -290,36 +513,60 @@ class BulkProcessor:
     
     def cancel_job(self, job_id: str, user_id: int) -> bool:
         """Cancel a job (only if user owns it)"""
-        if job_id not in self.jobs:
+        job = self.store.get_job(job_id)
+        if job is None:
             return False
         
-        job = self.jobs[job_id]
-        
         # Check if user owns this job
         if job['user_id'] != user_id:
             return False
         
-        # Only allow cancellation if job is still pending or processing
-        if job['status'] in ['pending', 'processing']:
-            job['status'] = 'cancelled'
-            job['completed_at'] = datetime.now().isoformat()
-            return True
-        
-        return False
+        # Only allow cancellation if job is still pending or processing; the worker
+        # running it notices the new status, in whichever process it runs
+        return self.store.transition(
+            job_id, ('pending', 'processing'),
+            status='cancelled', completed_at=datetime.now().isoformat()
+        )
     
     def cleanup_old_jobs(self, max_age_hours: int = 24):
         """Clean up old completed jobs"""
-        cutoff_time = datetime.now().timestamp() - (max_age_hours * 3600)
-        
-        jobs_to_remove = []
-        for job_id, job in self.jobs.items():
-            if job['status'] in ['completed', 'failed', 'cancelled']:
-                job_time = datetime.fromisoformat(job['created_at']).timestamp()
-                if job_time < cutoff_time:
-                    jobs_to_remove.append(job_id)
-        
-        for job_id in jobs_to_remove:
-            del self.jobs[job_id]
+        cutoff_time = datetime.fromtimestamp(datetime.now().timestamp() - (max_age_hours * 3600))
+        self.store.delete_jobs(('completed', 'failed', 'cancelled'), cutoff_time.isoformat())
+
+def scan_errors(scan_type: str, data: Any) -> List[str]:
+    """
+    Collect the error messages a checker reported inside its result: the top-level error
+    plus per-record (DNS), per-zone (BLACKLIST) and per-lookup (EMAIL) errors
+    """
+    if not isinstance(data, dict):
+        return []
+    errors = [data['error']] if data.get('error') else []
+    scan_type = scan_type.upper()
+    
+    if scan_type == 'DNS':
+        for values in (data.get('records') or {}).values():
+            errors.extend(v for v in values if isinstance(v, str) and v.startswith('Error'))
+    elif scan_type == 'BLACKLIST':
+        for zone in (data.get('blacklists') or {}).values():
+            if str(zone.get('status', '')).startswith('Error'):
+                errors.append(zone['status'])
+    elif scan_type == 'EMAIL':
+        if str(data.get('mx_status', '')).startswith('Error'):
+            errors.append(data['mx_status'])
+        security = data.get('security_records') or {}
+        for name in ('spf', 'dmarc'):
+            status = str((security.get(name) or {}).get('status', ''))
+            if status.startswith('Error'):
+                errors.append(status)
+        if (security.get('dkim') or {}).get('timed_out'):
+            errors.append('DKIM selector discovery timed out')
+        # Port 25 is often filtered, so only replies from a throttling server count, not timeouts
+        for server in (data.get('smtp_tests') or {}).values():
+            for test in (server.get('tests') or {}).values() if isinstance(server, dict) else []:
+                banner = str(test.get('banner', '')) if isinstance(test, dict) else ''
+                if banner[:3] in ('421', '450', '451'):
+                    errors.append(banner)
+    return errors
 
 def parse_csv_domains(file_content: str) -> List[str]:
     """Parse domains from CSV content"""
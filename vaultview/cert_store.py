@@ -0,0 +1,264 @@
+import json
+import base64
+import binascii
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Dict, Any, List, Optional
+from sqlalchemy import event, select, func
+from sqlalchemy.orm.attributes import set_committed_value
+from vaultview.db import db
+from vaultview.models import ScanResult, Certificate, CertificateExpiry
+from vaultview.utils import get_ist_now
+
+# Per-scan fields kept in ScanResult.result_data for SSL rows
+SSL_OBSERVATION_FIELDS = ('is_valid', 'days_until_expiry')
+MAX_CACHED_CERTIFICATES = 4096
+
+# Certificates never change for a fingerprint, so their fields can be cached freely
+_certificate_fields = OrderedDict()
+_certificate_fields_lock = threading.Lock()
+
+def insert_ignore(connection, table, values: Dict[str, Any], update: Optional[Dict[str, Any]] = None,
+                  conflict_columns: Optional[List[str]] = None):
+    """
+    Insert a row, ignoring (or updating) it when its key already exists
+    """
+    dialect = connection.dialect.name
+    if dialect in ('sqlite', 'postgresql'):
+        if dialect == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert
+        stmt = insert(table).values(**values)
+        conflict_columns = conflict_columns or [c.name for c in table.primary_key.columns]
+        if update:
+            stmt = stmt.on_conflict_do_update(index_elements=conflict_columns, set_=update)
+        else:
+            stmt = stmt.on_conflict_do_nothing(index_elements=conflict_columns)
+        connection.execute(stmt)
+        return
+
+    # Other databases: check first, then write
+    key = {c: values[c] for c in (conflict_columns or [c.name for c in table.primary_key.columns])}
+    condition = [table.c[c] == v for c, v in key.items()]
+    if connection.execute(select(*[table.c[c] for c in key]).where(*condition)).first() is None:
+        connection.execute(table.insert().values(**values))
+    elif update:
+        connection.execute(table.update().where(*condition).values(**update))
+
+def _parse_datetime(value: Optional[str]) -> Optional[datetime]:
+    """Parse an ISO timestamp from an SSL result"""
+    try:
+        return datetime.fromisoformat(value) if value else None
+    except ValueError:
+        return None
+
+def _certificate_to_fields(row) -> Dict[str, Any]:
+    """Convert a certificate row into SSL result fields"""
+    return {
+        'subject': row.subject,
+        'issuer': row.issuer,
+        'valid_from': row.valid_from.isoformat() if row.valid_from else None,
+        'valid_until': row.valid_until.isoformat() if row.valid_until else None,
+        'serial_number': row.serial_number,
+        'version': row.version if row.version is not None else 'Unknown'
+    }
+
+def _cache_certificate_fields(fingerprint: str, fields: Dict[str, Any]):
+    """Remember certificate fields, evicting the least recently used"""
+    with _certificate_fields_lock:
+        _certificate_fields[fingerprint] = fields
+        _certificate_fields.move_to_end(fingerprint)
+        while len(_certificate_fields) > MAX_CACHED_CERTIFICATES:
+            _certificate_fields.popitem(last=False)
+
+def _load_certificate_fields(connection, fingerprint: str) -> Optional[Dict[str, Any]]:
+    """Get certificate fields from the cache or the certificate table"""
+    with _certificate_fields_lock:
+        fields = _certificate_fields.get(fingerprint)
+    if fields is not None:
+        return fields
+
+    table = Certificate.__table__
+    row = connection.execute(select(table).where(table.c.fingerprint_sha256 == fingerprint)).first()
+    if row is None:
+        return None
+
+    fields = _certificate_to_fields(row)
+    _cache_certificate_fields(fingerprint, fields)
+    return fields
+
+def expand_ssl_result(domain: str, fingerprint: str, observations: Dict[str, Any],
+                      fields: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Rebuild the full SSL result from a certificate and per-scan observations
+    """
+    return {
+        'domain': domain,
+        'subject': fields['subject'],
+        'issuer': fields['issuer'],
+        'valid_from': fields['valid_from'],
+        'valid_until': fields['valid_until'],
+        'is_valid': observations.get('is_valid'),
+        'days_until_expiry': observations.get('days_until_expiry'),
+        'serial_number': fields['serial_number'],
+        'version': fields['version'],
+        'fingerprint_sha256': fingerprint
+    }
+
+@event.listens_for(ScanResult, 'before_insert')
+def _store_ssl_certificate(mapper, connection, target):
+    """Move the certificate of an SSL scan into the certificate store"""
+    if target.result_type != 'SSL' or target.cert_fingerprint:
+        return
+
+    try:
+        data = json.loads(target.result_data)
+    except (json.JSONDecodeError, TypeError):
+        return
+
+    fingerprint = data.get('fingerprint_sha256')
+    if not fingerprint or 'error' in data:
+        return
+
+    try:
+        der = base64.b64decode(data['certificate_der']) if data.get('certificate_der') else None
+    except (binascii.Error, TypeError):
+        der = None
+
+    table = Certificate.__table__
+    version = data.get('version')
+    insert_ignore(connection, table, {
+        'fingerprint_sha256': fingerprint,
+        'subject': data.get('subject'),
+        'issuer': data.get('issuer'),
+        'valid_from': _parse_datetime(data.get('valid_from')),
+        'valid_until': _parse_datetime(data.get('valid_until')),
+        'serial_number': data.get('serial_number'),
+        'version': version if isinstance(version, int) else None,
+        'der': der,
+        'first_seen': get_ist_now()
+    }, update={'der': func.coalesce(table.c.der, der)} if der else None)
+
+    target.cert_fingerprint = fingerprint
+    target.result_data = json.dumps({f: data.get(f) for f in SSL_OBSERVATION_FIELDS}, separators=(',', ':'))
+
+@event.listens_for(ScanResult, 'after_insert')
+def _update_certificate_expiry(mapper, connection, target):
+    """Keep the expiry table pointing at the latest certificate of each domain"""
+    if target.result_type != 'SSL' or not target.cert_fingerprint:
+        return
+
+    fields = _load_certificate_fields(connection, target.cert_fingerprint)
+    not_after = _parse_datetime(fields['valid_until']) if fields else None
+    if not_after is None:
+        return
+
+    values = {
+        'not_after': not_after,
+        'issuer': fields['issuer'],
+        'cert_fingerprint': target.cert_fingerprint,
+        'scan_result_id': target.id,
+        'updated_at': get_ist_now()
+    }
+    insert_ignore(connection, CertificateExpiry.__table__,
+                  {'user_id': target.user_id, 'domain': target.domain, **values},
+                  update=values, conflict_columns=['user_id', 'domain'])
+
+def _expand_loaded_result(target, context):
+    """Present SSL rows with their full certificate fields"""
+    if not target.cert_fingerprint or 'result_data' not in target.__dict__:
+        return
+
+    try:
+        observations = json.loads(target.result_data)
+    except (json.JSONDecodeError, TypeError):
+        return
+    if 'subject' in observations:
+        return
+
+    fields = _load_certificate_fields(context.session.connection(), target.cert_fingerprint)
+    if fields is None:
+        return
+
+    expanded = expand_ssl_result(target.domain, target.cert_fingerprint, observations, fields)
+    set_committed_value(target, 'result_data', json.dumps(expanded, indent=2))
+
+@event.listens_for(ScanResult, 'load')
+def _on_scan_result_load(target, context):
+    _expand_loaded_result(target, context)
+
+@event.listens_for(ScanResult, 'refresh')
+def _on_scan_result_refresh(target, context, attrs):
+    _expand_loaded_result(target, context)
+
+def get_certificate(fingerprint: str) -> Optional[Dict[str, Any]]:
+    """
+    Get a stored certificate by its SHA-256 fingerprint
+    """
+    certificate = db.session.get(Certificate, fingerprint)
+    if certificate is None:
+        return None
+
+    return {
+        'fingerprint_sha256': certificate.fingerprint_sha256,
+        **_certificate_to_fields(certificate),
+        'has_der': certificate.der is not None,
+        'first_seen': certificate.first_seen.isoformat() if certificate.first_seen else None
+    }
+
+def domains_for_certificate(fingerprint: str, user_id: int) -> List[str]:
+    """
+    List the domains a user has seen serving a certificate
+    """
+    rows = db.session.query(ScanResult.domain).filter(
+        ScanResult.cert_fingerprint == fingerprint,
+        ScanResult.user_id == user_id
+    ).distinct().order_by(ScanResult.domain).all()
+    return [row.domain for row in rows]
+
+def _expiry_to_dict(row: CertificateExpiry, now: datetime) -> Dict[str, Any]:
+    """Convert an expiry row into an API/report entry"""
+    return {
+        'domain': row.domain,
+        'not_after': row.not_after.isoformat(),
+        'days_until_expiry': (row.not_after - now).days,
+        'is_valid': row.not_after >= now,
+        'issuer': row.issuer,
+        'fingerprint_sha256': row.cert_fingerprint,
+        'scan_result_id': row.scan_result_id
+    }
+
+def get_expiring_certificates(user_id: int, days: int = 30, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    List a user's certificates expiring within the given number of days (expired ones included)
+    """
+    now = datetime.now()
+    query = CertificateExpiry.query.filter(
+        CertificateExpiry.user_id == user_id,
+        CertificateExpiry.not_after <= now + timedelta(days=days)
+    ).order_by(CertificateExpiry.not_after)
+    if limit:
+        query = query.limit(limit)
+    return [_expiry_to_dict(row, now) for row in query.all()]
+
+def get_all_expiring_certificates(days: int = 30, expired_since: Optional[datetime] = None) -> List[Dict[str, Any]]:
+    """
+    List certificates expiring within the given number of days for every user, leaving out
+    those that had already expired at expired_since when it is given
+    """
+    now = datetime.now()
+    query = CertificateExpiry.query.filter(CertificateExpiry.not_after <= now + timedelta(days=days))
+    if expired_since is not None:
+        query = query.filter(CertificateExpiry.not_after > expired_since)
+    rows = query.order_by(CertificateExpiry.not_after).all()
+    return [{'user_id': row.user_id, **_expiry_to_dict(row, now)} for row in rows]
+
+def get_certificate_expiries(user_id: int) -> List[Dict[str, Any]]:
+    """
+    List the latest certificate expiry of every domain a user has scanned
+    """
+    now = datetime.now()
+    rows = CertificateExpiry.query.filter_by(user_id=user_id).order_by(CertificateExpiry.not_after).all()
+    return [_expiry_to_dict(row, now) for row in rows]
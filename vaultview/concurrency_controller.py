@@ -0,0 +1,125 @@
+import threading
+import time
+from typing import Dict, Any, Optional
+
+# Share of a window's scans that may time out or be throttled before backing off
+ERROR_RATE_THRESHOLD = 0.1
+# Back off when a window's mean latency exceeds the best seen by this factor
+LATENCY_TOLERANCE = 2.0
+# Multiplicative decrease on errors and on latency inflation
+ERROR_BACKOFF = 0.5
+LATENCY_BACKOFF = 0.8
+# Completions per adjustment window, at least (the window is otherwise `limit` scans)
+MIN_WINDOW = 10
+# The latency baseline drifts up slowly so a permanently slower target is re-learned
+BASELINE_DRIFT = 0.01
+
+# Error texts that signal overload (resolver, SMTP or DNSBL throttling) rather than a bad domain
+OVERLOAD_MARKERS = (
+    'timeout', 'timed out', 'servfail', 'refused', 'rate limit', 'too many',
+    'temporarily', 'try again', 'resource temporarily unavailable', '421 ', '450 ', '451 '
+)
+
+def is_overload_error(error: Optional[str]) -> bool:
+    """Check whether an error message looks like throttling or an overloaded upstream"""
+    if not error:
+        return False
+    error = str(error).lower()
+    return any(marker in error for marker in OVERLOAD_MARKERS)
+
+class AIMDController:
+    """
+    Additive-increase/multiplicative-decrease concurrency limit for one scan type.
+    Every window of completions the limit grows by one, unless the window saw
+    too many overload errors or its latency rose well above the best observed.
+    """
+
+    def __init__(self, max_limit: int, initial: Optional[int] = None, min_limit: int = 1, adaptive: bool = True):
+        self.adaptive = adaptive
+        self.max_limit = max(min_limit, max_limit)
+        self.min_limit = min_limit
+        # Start low and probe upwards; a fixed controller stays at the maximum
+        if initial is None:
+            initial = max(min_limit, max_limit // 4) if adaptive else max_limit
+        self.limit = float(min(max(initial, min_limit), self.max_limit))
+        self.in_flight = 0
+        self.baseline_latency = None
+        self.increases = 0
+        self.decreases = 0
+        self._window_count = 0
+        self._window_errors = 0
+        self._window_latency = 0.0
+        self._last_error_rate = 0.0
+        self._last_latency = None
+        self._last_decrease = 0.0
+        self._lock = threading.Lock()
+
+    def try_acquire(self) -> bool:
+        """Take a slot if fewer than the current limit are in flight"""
+        with self._lock:
+            if self.in_flight >= int(self.limit):
+                return False
+            self.in_flight += 1
+            return True
+
+    def release(self, started: float, overloaded: bool):
+        """
+        Return a slot taken at time.monotonic() `started`, recording the scan's latency
+        and whether it hit an overload error
+        """
+        with self._lock:
+            self.in_flight -= 1
+            # Scans started before the last decrease reflect the old limit, so they are not counted
+            if started < self._last_decrease:
+                return
+            self._window_count += 1
+            latency = time.monotonic() - started
+            self._window_latency += latency
+            if overloaded:
+                self._window_errors += 1
+
+            if self.adaptive and self._window_count >= max(MIN_WINDOW, int(self.limit)):
+                self._adjust()
+
+    def _adjust(self):
+        error_rate = self._window_errors / self._window_count
+        latency = self._window_latency / self._window_count
+        self._window_count = 0
+        self._window_errors = 0
+        self._window_latency = 0.0
+        self._last_error_rate = error_rate
+        self._last_latency = latency
+
+        if self.baseline_latency is None or latency < self.baseline_latency:
+            self.baseline_latency = latency
+        else:
+            self.baseline_latency += (latency - self.baseline_latency) * BASELINE_DRIFT
+
+        if error_rate > ERROR_RATE_THRESHOLD:
+            self._decrease(ERROR_BACKOFF)
+        elif latency > self.baseline_latency * LATENCY_TOLERANCE:
+            self._decrease(LATENCY_BACKOFF)
+        elif self.limit < self.max_limit:
+            self.limit = min(self.limit + 1, self.max_limit)
+            self.increases += 1
+
+    def _decrease(self, factor: float):
+        limit = max(self.min_limit, self.limit * factor)
+        if limit < self.limit:
+            self.limit = limit
+            self.decreases += 1
+            self._last_decrease = time.monotonic()
+
+    def get_status(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'adaptive': self.adaptive,
+                'limit': int(self.limit),
+                'max_limit': self.max_limit,
+                'in_flight': self.in_flight,
+                'error_rate': round(self._last_error_rate, 4),
+                'latency_ms': round(self._last_latency * 1000, 1) if self._last_latency is not None else None,
+                'baseline_latency_ms': round(self.baseline_latency * 1000, 1) if self.baseline_latency is not None else None,
+                'increases': self.increases,
+                'decreases': self.decreases
+            }
@@ -0,0 +1,185 @@
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Dict, Any, List, Optional
+import time
+import dns.resolver
+from vaultview.dns_cache import resolve
+
+# Concurrent selector queries per domain
+MAX_DKIM_WORKERS = 16
+# Overall time allowed for selector discovery (seconds)
+DKIM_DEADLINE = 6
+
+# Known mail providers: MX host suffixes and the DKIM selectors they publish
+MAIL_PROVIDERS = {
+    'Google Workspace': {
+        'mx': ['google.com', 'googlemail.com'],
+        'selectors': ['google', 'google2048', 'googleapps']
+    },
+    'Microsoft 365': {
+        'mx': ['outlook.com', 'protection.outlook.com'],
+        'selectors': ['selector1', 'selector2']
+    },
+    'Proton Mail': {
+        'mx': ['protonmail.ch', 'proton.me'],
+        'selectors': ['protonmail', 'protonmail2', 'protonmail3']
+    },
+    'Zoho Mail': {
+        'mx': ['zoho.com', 'zoho.eu', 'zoho.in'],
+        'selectors': ['zoho', 'zmail', 'zohomail']
+    },
+    'Fastmail': {
+        'mx': ['messagingengine.com'],
+        'selectors': ['fm1', 'fm2', 'fm3', 'mesmtp']
+    },
+    'Yahoo': {
+        'mx': ['yahoodns.net'],
+        'selectors': ['s1024', 's2048']
+    },
+    'iCloud Mail': {
+        'mx': ['icloud.com', 'apple.com'],
+        'selectors': ['sig1']
+    },
+    'Mimecast': {
+        'mx': ['mimecast.com', 'mimecast.co.za'],
+        'selectors': ['mimecast20190104', 'mimecast20200922', 'mimecast']
+    },
+    'Proofpoint': {
+        'mx': ['pphosted.com', 'ppe-hosted.com'],
+        'selectors': ['pp', 'pps1', 'proofpoint']
+    },
+    'Amazon WorkMail': {
+        'mx': ['awsapps.com'],
+        'selectors': ['amazonses']
+    },
+    'Yandex': {
+        'mx': ['yandex.net', 'yandex.ru'],
+        'selectors': ['mail']
+    },
+    'OVHcloud': {
+        'mx': ['ovh.net'],
+        'selectors': ['ovhmo', 'ovhex']
+    },
+    'GoDaddy': {
+        'mx': ['secureserver.net'],
+        'selectors': ['default', 'secureserver']
+    },
+    'Mailgun': {
+        'mx': ['mailgun.org'],
+        'selectors': ['mailo', 'mg', 'krs', 'smtp', 'pic']
+    }
+}
+
+# Selectors used by common platforms and sending services, most frequent first
+COMMON_DKIM_SELECTORS = [
+    'default', 'google', 'selector1', 'selector2', 'k1', 'k2', 'k3', 'mail', 's1', 's2',
+    'dkim', 'smtp', 'mx', 'email', 'key1', 'key2', 'sig1', 'mandrill', 'mailjet', 'mxvault',
+    'sendgrid', 'smtpapi', 'em', 'cm', 'mte1', 'mte2', 'pm', 'pm-bounces', 'sparkpost',
+    'spop1024', 'scph0316', 'zendesk1', 'zendesk2', 'hs1', 'hs2', 'hubspot', 'ctct1', 'ctct2',
+    'turbo-smtp', 'everlytickey1', 'everlytickey2', 'mailchimp', 'mc', 'amazonses', 'fd', 'fd2',
+    'protonmail', 'protonmail2', 'protonmail3', 'zoho', 'zmail', 'fm1', 'fm2', 'fm3',
+    's1024', 's2048', 'dkim1', 'dkim2', 'a1', 'class', 'main', 'mesmtp', 'mailo', 'mg',
+    'krs', 'pic', 'm1', 'mail1', 'mail2', 'x', 'ml', 'dk', 'test', 'private', 'selector',
+    'api', 'newsletter', 'mkto', 'm365', 'mimecast20190104', 'pp', 'pps1', 'ovhmo', 'ovhex',
+    '20161025', '20210112', '20230601', 'google2048', 'googleapps', 'secureserver'
+]
+
+def detect_mail_provider(mx_records: Optional[List[Dict[str, Any]]]) -> Optional[str]:
+    """
+    Identify the mail provider from MX hostnames (as returned by check_mx_records)
+    """
+    for record in mx_records or []:
+        host = str(record.get('server', '')).lower().rstrip('.')
+        for provider, info in MAIL_PROVIDERS.items():
+            if any(host == suffix or host.endswith('.' + suffix) for suffix in info['mx']):
+                return provider
+    return None
+
+def order_selectors(provider: Optional[str]) -> List[str]:
+    """
+    Get the selector dictionary with the provider's own selectors first
+    """
+    preferred = MAIL_PROVIDERS[provider]['selectors'] if provider in MAIL_PROVIDERS else []
+    return preferred + [selector for selector in COMMON_DKIM_SELECTORS if selector not in preferred]
+
+def lookup_dkim_selector(domain: str, selector: str, engine=None) -> Optional[Dict[str, Any]]:
+    """
+    Query one selector; returns the record if it publishes a DKIM key
+    """
+    try:
+        txt_records = resolve(f"{selector}._domainkey.{domain}", 'TXT', engine=engine)
+    except (dns.resolver.NXDOMAIN, dns.resolver.NoAnswer):
+        return None
+
+    for record in txt_records:
+        record_str = b''.join(record.strings).decode('utf-8', errors='ignore')
+        tags = dict(tag.strip().split('=', 1) for tag in record_str.split(';') if '=' in tag)
+        tags = {name.strip(): value.strip() for name, value in tags.items()}
+        if tags.get('v') == 'DKIM1' or 'p' in tags:
+            return {
+                'selector': selector,
+                'record': record_str,
+                # An empty public key means the selector has been revoked
+                'status': 'Valid' if tags.get('p') else 'Revoked'
+            }
+    return None
+
+def discover_dkim_selectors(domain: str, provider: Optional[str] = None, engine=None) -> Dict[str, Any]:
+    """
+    Probe the selector dictionary concurrently, provider selectors first. Once every
+    provider selector has answered and one of them has a valid key, the remaining probes
+    are dropped. Revoked selectors (empty p=) are reported apart from the valid records.
+    """
+    selectors = order_selectors(provider)
+    preferred = set(MAIL_PROVIDERS[provider]['selectors']) if provider in MAIL_PROVIDERS else set()
+    records = {}
+    revoked = {}
+    checked = 0
+    errors = 0
+    deadline = time.monotonic() + DKIM_DEADLINE
+
+    executor = ThreadPoolExecutor(max_workers=MAX_DKIM_WORKERS)
+    try:
+        # Submitted in dictionary order, so the provider's selectors are queried first
+        pending = {executor.submit(lookup_dkim_selector, domain, selector, engine): selector for selector in selectors}
+        pending_preferred = set(preferred)
+        stopped_early = False
+
+        while pending:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            done, _ = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            for future in done:
+                selector = pending.pop(future)
+                pending_preferred.discard(selector)
+                checked += 1
+                try:
+                    record = future.result()
+                except Exception:
+                    errors += 1
+                    continue
+                if record is None:
+                    continue
+                if record['status'] == 'Revoked':
+                    revoked[selector] = record
+                else:
+                    records[selector] = record
+
+            if preferred and not pending_preferred and preferred & set(records):
+                stopped_early = True
+                break
+
+        for future in pending:
+            future.cancel()
+    finally:
+        executor.shutdown(wait=False)
+
+    return {
+        'records': [records[selector] for selector in selectors if selector in records],
+        'revoked': [revoked[selector] for selector in selectors if selector in revoked],
+        'selectors_checked': checked,
+        'selectors_total': len(selectors),
+        'stopped_early': stopped_early,
+        'timed_out': bool(pending) and not stopped_early,
+        'errors': errors
+    }
@@ -0,0 +1,193 @@
+import threading
+import time
+from typing import Dict, Any
+import dns.name
+import dns.rdataclass
+import dns.rdatatype
+import dns.resolver
+from vaultview.dns_pipeline import bulk_dns_engine
+from vaultview.resolver_pool import get_resolver_pool
+
+# Negative answers without an SOA record are remembered for this long (seconds)
+DEFAULT_NEGATIVE_TTL = 300
+MAX_NEGATIVE_TTL = 3600
+MAX_NEGATIVE_ENTRIES = 100000
+
+# Positive answers held by the shared resolver's LRU cache
+DEFAULT_CACHE_SIZE = 100000
+
+_resolver = None
+_resolver_lock = threading.Lock()
+
+def _normalize(name) -> str:
+    """Normalize a DNS name for use as a cache key"""
+    return str(name).lower().rstrip('.')
+
+def negative_ttl(response) -> float:
+    """
+    Get the negative caching TTL of a response: min(SOA TTL, SOA minimum) per RFC 2308
+    """
+    if response is not None:
+        for rrset in response.authority:
+            if rrset.rdtype == dns.rdatatype.SOA and len(rrset):
+                return min(rrset.ttl, rrset[0].minimum, MAX_NEGATIVE_TTL)
+    return DEFAULT_NEGATIVE_TTL
+
+class NegativeCache:
+    """Remembers NXDOMAIN and NoAnswer results so later lookups can skip the network"""
+
+    def __init__(self, max_entries: int = MAX_NEGATIVE_ENTRIES):
+        self.max_entries = max_entries
+        self._nxdomain = {}
+        self._noanswer = {}
+        self._lock = threading.Lock()
+        self.nxdomain_hits = 0
+        self.noanswer_hits = 0
+
+    def is_nxdomain(self, name) -> bool:
+        """Check whether a name, or any of its parents, is known not to exist (RFC 8020)"""
+        labels = _normalize(name).split('.')
+        now = time.monotonic()
+        with self._lock:
+            for i in range(len(labels) - 1):
+                expires = self._nxdomain.get('.'.join(labels[i:]))
+                if expires is not None and expires > now:
+                    self.nxdomain_hits += 1
+                    return True
+        return False
+
+    def is_noanswer(self, name, rdtype) -> bool:
+        """Check whether a name is known to have no records of a type"""
+        key = (_normalize(name), str(rdtype).upper())
+        with self._lock:
+            expires = self._noanswer.get(key)
+            if expires is not None and expires > time.monotonic():
+                self.noanswer_hits += 1
+                return True
+        return False
+
+    def add_nxdomain(self, name, ttl: float):
+        """Remember that a name does not exist"""
+        with self._lock:
+            self._nxdomain[_normalize(name)] = time.monotonic() + ttl
+            self._evict(self._nxdomain)
+
+    def add_noanswer(self, name, rdtype, ttl: float):
+        """Remember that a name has no records of a type"""
+        with self._lock:
+            self._noanswer[(_normalize(name), str(rdtype).upper())] = time.monotonic() + ttl
+            self._evict(self._noanswer)
+
+    def _evict(self, entries: Dict):
+        """Drop expired entries, then the oldest ones, once the cache is full"""
+        if len(entries) <= self.max_entries:
+            return
+        now = time.monotonic()
+        for key in [k for k, expires in entries.items() if expires <= now]:
+            del entries[key]
+        while len(entries) > self.max_entries:
+            del entries[next(iter(entries))]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get negative cache sizes and hit counters"""
+        with self._lock:
+            return {
+                'nxdomain_entries': len(self._nxdomain),
+                'noanswer_entries': len(self._noanswer),
+                'nxdomain_hits': self.nxdomain_hits,
+                'noanswer_hits': self.noanswer_hits
+            }
+
+# Global negative cache instance
+negative_cache = NegativeCache()
+
+def configure_resolver(cache_size: int = DEFAULT_CACHE_SIZE, nameservers=None, lifetime: float = None):
+    """
+    Build the process-wide resolver shared by every DNS-based checker
+    """
+    global _resolver
+    resolver = dns.resolver.Resolver()
+    resolver.cache = dns.resolver.LRUCache(cache_size)
+    if nameservers:
+        resolver.nameservers = list(nameservers)
+    if lifetime:
+        resolver.lifetime = lifetime
+    with _resolver_lock:
+        _resolver = resolver
+    return resolver
+
+def get_resolver() -> dns.resolver.Resolver:
+    """
+    Get the shared resolver, creating it with default settings on first use
+    """
+    global _resolver
+    if _resolver is None:
+        with _resolver_lock:
+            if _resolver is None:
+                resolver = dns.resolver.Resolver()
+                resolver.cache = dns.resolver.LRUCache(DEFAULT_CACHE_SIZE)
+                _resolver = resolver
+    return _resolver
+
+def get_cache_stats() -> Dict[str, Any]:
+    """
+    Get hit/miss counters of the shared resolver cache and the negative cache
+    """
+    cache = get_resolver().cache
+    hits = cache.hits()
+    misses = cache.misses()
+    return {
+        'entries': len(cache.data),
+        'max_size': cache.max_size,
+        'hits': hits,
+        'misses': misses,
+        'hit_rate': round(hits / (hits + misses), 4) if hits + misses else 0,
+        'negative': negative_cache.get_stats(),
+        'bulk_engine': bulk_dns_engine.get_stats(),
+        'upstream_pool': get_resolver_pool().get_stats() if get_resolver_pool() else None
+    }
+
+def resolve(qname, rdtype='A', engine=None, **kwargs):
+    """
+    Resolve a DNS query, answering known NXDOMAIN/NoAnswer names from the negative cache.
+    Bulk jobs pass their pipelined engine; other lookups use the resolver pool or resolver.
+    """
+    if negative_cache.is_nxdomain(qname):
+        raise dns.resolver.NXDOMAIN(qnames=[dns.name.from_text(str(qname))], responses={})
+    if negative_cache.is_noanswer(qname, rdtype):
+        raise dns.resolver.NoAnswer()
+
+    try:
+        if engine is not None:
+            return _resolve_cached(qname, rdtype, engine.resolve, kwargs.get('lifetime'))
+        pool = get_resolver_pool()
+        if pool is not None:
+            return _resolve_cached(qname, rdtype, pool.resolve, kwargs.get('lifetime'))
+        return get_resolver().resolve(qname, rdtype, **kwargs)
+    except dns.resolver.NXDOMAIN as e:
+        response = next(iter(e.responses().values()), None)
+        negative_cache.add_nxdomain(qname, negative_ttl(response))
+        raise
+    except dns.resolver.NoAnswer as e:
+        negative_cache.add_noanswer(qname, rdtype, negative_ttl(e.kwargs.get('response')))
+        raise
+
+def _resolve_cached(qname, rdtype, fetch, lifetime=None) -> dns.resolver.Answer:
+    """
+    Resolve through the bulk engine or resolver pool, sharing the resolver's answer cache
+    """
+    cache = get_resolver().cache
+    key = (dns.name.from_text(str(qname)), dns.rdatatype.from_text(str(rdtype)), dns.rdataclass.IN)
+    answer = cache.get(key)
+    if answer is not None:
+        return answer
+
+    answer = fetch(qname, rdtype, lifetime)
+    cache.put(key, answer)
+    return answer
+
+def is_known_nxdomain(name) -> bool:
+    """
+    Check whether a name is cached as non-existent
+    """
+    return negative_cache.is_nxdomain(name)
@@ -1,11 +1,20 @@
 import dns.resolver
 import dns.reversename
 import json
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from typing import Dict, List, Any
+from vaultview.dns_cache import resolve, is_known_nxdomain
 
-def check_dns(domain):
+# Record types checked by check_dns, in output order
+DNS_RECORD_TYPES = ['A', 'AAAA', 'MX', 'NS', 'TXT', 'CNAME', 'CAA']
+
+# Overall per-domain deadline in seconds (dnspython's default query lifetime)
+DNS_DEADLINE = 5.0
+
+def check_dns(domain, engine=None):
     """
-    Check DNS records for a given domain
+    Check DNS records for a given domain; bulk jobs pass their pipelined DNS engine
     """
     try:
         result = {
@@ -13,77 +22,57 @@ def check_dns(domain):
             'records': {}
         }
         
-        # Check A records
-        try:
-            a_records = dns.resolver.resolve(domain, 'A')
-            result['records']['A'] = [str(record) for record in a_records]
-        except dns.resolver.NXDOMAIN:
-            result['records']['A'] = ['Domain not found']
-        except dns.resolver.NoAnswer:
-            result['records']['A'] = ['No A records found']
-        except Exception as e:
-            result['records']['A'] = [f'Error: {str(e)}']
+        # A name already known not to exist needs no queries at all
+        if is_known_nxdomain(domain):
+            for record_type in DNS_RECORD_TYPES:
+                result['records'][record_type] = ['Domain not found']
+            return json.dumps(result, indent=2)
         
-        # Check AAAA records (IPv6)
+        # Issue every record type at once so the scan takes about as long as the slowest query
+        deadline = time.monotonic() + DNS_DEADLINE
+        executor = ThreadPoolExecutor(max_workers=len(DNS_RECORD_TYPES))
         try:
-            aaaa_records = dns.resolver.resolve(domain, 'AAAA')
-            result['records']['AAAA'] = [str(record) for record in aaaa_records]
-        except dns.resolver.NXDOMAIN:
-            result['records']['AAAA'] = ['Domain not found']
-        except dns.resolver.NoAnswer:
-            result['records']['AAAA'] = ['No AAAA records found']
-        except Exception as e:
-            result['records']['AAAA'] = [f'Error: {str(e)}']
+            futures = {
+                record_type: executor.submit(lookup_records, domain, record_type, DNS_DEADLINE, engine)
+                for record_type in DNS_RECORD_TYPES
+            }
+            pending = set(futures.values())
+            while pending:
+                done, pending = wait(pending, timeout=max(0, deadline - time.monotonic()),
+                                     return_when=FIRST_COMPLETED)
+                # Stop waiting as soon as one answer says the domain does not exist
+                if not done or any(f.result() == ['Domain not found'] for f in done):
+                    break
+        finally:
+            executor.shutdown(wait=False)
         
-        # Check MX records
-        try:
-            mx_records = dns.resolver.resolve(domain, 'MX')
-            result['records']['MX'] = [f'{record.preference} {record.exchange}' for record in mx_records]
-        except dns.resolver.NXDOMAIN:
-            result['records']['MX'] = ['Domain not found']
-        except dns.resolver.NoAnswer:
-            result['records']['MX'] = ['No MX records found']
-        except Exception as e:
-            result['records']['MX'] = [f'Error: {str(e)}']
+        for record_type in DNS_RECORD_TYPES:
+            future = futures[record_type]
+            if future.done():
+                result['records'][record_type] = future.result()
+            elif is_known_nxdomain(domain):
+                result['records'][record_type] = ['Domain not found']
+            else:
+                result['records'][record_type] = [f'Error: DNS lookup timed out after {DNS_DEADLINE:g} seconds']
         
-        # Check NS records
-        try:
-            ns_records = dns.resolver.resolve(domain, 'NS')
-            result['records']['NS'] = [str(record) for record in ns_records]
-        except dns.resolver.NXDOMAIN:
-            result['records']['NS'] = ['Domain not found']
-        except dns.resolver.NoAnswer:
-            result['records']['NS'] = ['No NS records found']
-        except Exception as e:
-            result['records']['NS'] = [f'Error: {str(e)}']
+        return json.dumps(result, indent=2)
         
-        # Check TXT records
-        try:
-            txt_records = dns.resolver.resolve(domain, 'TXT')
-            result['records']['TXT'] = [str(record) for record in txt_records]
-        except dns.resolver.NXDOMAIN:
-            result['records']['TXT'] = ['Domain not found']
-        except dns.resolver.NoAnswer:
-            result['records']['TXT'] = ['No TXT records found']
-        except Exception as e:
-            result['records']['TXT'] = [f'Error: {str(e)}']
+    except Exception as e:
+        return json.dumps({'error': f'Unexpected error for {domain}: {str(e)}'})
+
+def lookup_records(domain: str, record_type: str, lifetime: float = DNS_DEADLINE, engine=None) -> List[Any]:
+    """
+    Look up one record type for a domain and format it for check_dns
+    """
+    try:
+        answers = resolve(domain, record_type, engine=engine, lifetime=lifetime)
         
-        # Check CNAME records
-        try:
-            cname_records = dns.resolver.resolve(domain, 'CNAME')
-            result['records']['CNAME'] = [str(record) for record in cname_records]
-        except dns.resolver.NXDOMAIN:
-            result['records']['CNAME'] = ['Domain not found']
-        except dns.resolver.NoAnswer:
-            result['records']['CNAME'] = ['No CNAME records found']
-        except Exception as e:
-            result['records']['CNAME'] = [f'Error: {str(e)}']
+        if record_type == 'MX':
+            return [f'{record.preference} {record.exchange}' for record in answers]
         
-        # Check CAA records (Certification Authority Authorization)
-        try:
-            caa_records = dns.resolver.resolve(domain, 'CAA')
-            result['records']['CAA'] = []
-            for record in caa_records:
+        if record_type == 'CAA':
+            records = []
+            for record in answers:
                 # Parse CAA record components
                 caa_data = str(record)
                 # CAA records have format: <flags> <tag> <value>
@@ -93,26 +82,24 @@ def check_dns(domain):
                     tag = parts[1]
                     value = parts[2].strip('"')
                     
-                    caa_info = {
+                    records.append({
                         'flags': flags,
                         'tag': tag,
                         'value': value,
                         'description': get_caa_description(tag, value)
-                    }
-                    result['records']['CAA'].append(caa_info)
+                    })
                 else:
-                    result['records']['CAA'].append(caa_data)
-        except dns.resolver.NXDOMAIN:
-            result['records']['CAA'] = ['Domain not found']
-        except dns.resolver.NoAnswer:
-            result['records']['CAA'] = ['No CAA records found']
-        except Exception as e:
-            result['records']['CAA'] = [f'Error: {str(e)}']
+                    records.append(caa_data)
+            return records
         
-        return json.dumps(result, indent=2)
+        return [str(record) for record in answers]
         
+    except dns.resolver.NXDOMAIN:
+        return ['Domain not found']
+    except dns.resolver.NoAnswer:
+        return [f'No {record_type} records found']
     except Exception as e:
-        return json.dumps({'error': f'Unexpected error for {domain}: {str(e)}'})
+        return [f'Error: {str(e)}']
 
 def get_caa_description(tag, value):
     """
@@ -0,0 +1,343 @@
+import random
+import secrets
+import selectors
+import socket
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Any, List, Optional
+import dns.exception
+import dns.flags
+import dns.message
+import dns.name
+import dns.query
+import dns.rcode
+import dns.rdataclass
+import dns.rdatatype
+import dns.resolver
+
+DEFAULT_SOCKETS = 4
+DEFAULT_QUERY_TIMEOUT = 2.0
+DEFAULT_LIFETIME = 5.0
+DEFAULT_RETRIES = 2
+DEFAULT_MAX_OUTSTANDING = 2048
+MAX_UDP_PAYLOAD = 4096
+SOCKET_BUFFER_SIZE = 1 << 20
+# A socket is replaced after this many queries so the source port keeps changing
+SOCKET_ROTATE_QUERIES = 512
+
+class _PendingQuery:
+    """A query waiting for its response"""
+
+    __slots__ = ('qname', 'rdtype', 'message', 'wire', 'future', 'sock_id',
+                 'nameserver_index', 'attempts', 'retry_at', 'lifetime', 'expires_at')
+
+    def __init__(self, qname, rdtype, message, future, lifetime):
+        self.qname = qname
+        self.rdtype = rdtype
+        self.message = message
+        self.wire = message.to_wire()
+        self.future = future
+        self.sock_id = 0
+        self.nameserver_index = 0
+        self.attempts = 0
+        self.retry_at = 0.0
+        self.lifetime = lifetime
+        self.expires_at = None
+
+class BulkDNSEngine:
+    """
+    Multiplexes thousands of outstanding DNS queries over a few UDP sockets,
+    matching responses by query ID and question and falling back to TCP on truncation.
+    Sockets are rotated every SOCKET_ROTATE_QUERIES queries so source ports vary.
+    """
+
+    def __init__(self, nameservers: Optional[List[str]] = None, sockets: int = DEFAULT_SOCKETS,
+                 query_timeout: float = DEFAULT_QUERY_TIMEOUT, retries: int = DEFAULT_RETRIES,
+                 lifetime: float = DEFAULT_LIFETIME, max_outstanding: int = DEFAULT_MAX_OUTSTANDING):
+        self.nameservers = list(nameservers) if nameservers else None
+        self.socket_count = sockets
+        self.query_timeout = query_timeout
+        self.retries = retries
+        self.lifetime = lifetime
+        self.max_outstanding = max_outstanding
+        self.thread = None
+        self.running = False
+        self._lock = threading.Lock()
+        self._outbox = deque()
+        self._pending = {}
+        # Open sockets by id; new queries go to the active ones, retired ones drain and close
+        self._sockets = {}
+        self._active = []
+        self._socket_queries = {}
+        self._socket_pending = {}
+        self._next_socket_id = 0
+        self._selector = None
+        self._wakeup_r = None
+        self._wakeup_w = None
+        self._tcp_executor = ThreadPoolExecutor(max_workers=8)
+        self.stats = {'sent': 0, 'received': 0, 'retries': 0, 'timeouts': 0, 'tcp_fallbacks': 0,
+                      'mismatched': 0, 'socket_rotations': 0}
+
+    def configure(self, nameservers: Optional[List[str]] = None, sockets: Optional[int] = None,
+                  lifetime: Optional[float] = None):
+        """Set nameservers and socket count; takes effect the next time the engine starts"""
+        if nameservers:
+            self.nameservers = list(nameservers)
+        if sockets:
+            self.socket_count = sockets
+        if lifetime:
+            self.lifetime = lifetime
+
+    def start(self):
+        """Open the sockets and start the I/O thread"""
+        with self._lock:
+            if self.running:
+                return
+            if not self.nameservers:
+                self.nameservers = list(dns.resolver.get_default_resolver().nameservers)
+
+            self._selector = selectors.DefaultSelector()
+            self._sockets = {}
+            self._active = [self._open_socket() for _ in range(self.socket_count)]
+
+            self._wakeup_r, self._wakeup_w = socket.socketpair()
+            self._wakeup_r.setblocking(False)
+            self._selector.register(self._wakeup_r, selectors.EVENT_READ, None)
+
+            self.running = True
+            self.thread = threading.Thread(target=self._run, daemon=True)
+            self.thread.start()
+
+    def stop(self):
+        """Stop the I/O thread and fail any outstanding queries"""
+        with self._lock:
+            if not self.running:
+                return
+            self.running = False
+        self._wake()
+        self.thread.join()
+
+        for pending in list(self._pending.values()) + list(self._outbox):
+            pending.future.set_exception(dns.exception.Timeout(timeout=pending.lifetime))
+        self._pending.clear()
+        for sock in self._sockets.values():
+            sock.close()
+        self._sockets = {}
+        self._active = []
+        self._socket_queries = {}
+        self._socket_pending = {}
+        self._wakeup_r.close()
+        self._wakeup_w.close()
+        self._selector.close()
+
+    def submit(self, qname, rdtype='A', lifetime: Optional[float] = None) -> Future:
+        """Queue a query and return a future resolving to a dns.resolver.Answer"""
+        self.start()
+        qname = dns.name.from_text(str(qname))
+        rdtype = dns.rdatatype.from_text(rdtype) if isinstance(rdtype, str) else rdtype
+
+        future = Future()
+        future.set_running_or_notify_cancel()
+        message = dns.message.make_query(qname, rdtype, use_edns=0, payload=MAX_UDP_PAYLOAD)
+        self._outbox.append(_PendingQuery(qname, rdtype, message, future, lifetime or self.lifetime))
+        self._wake()
+        return future
+
+    def resolve(self, qname, rdtype='A', lifetime: Optional[float] = None) -> dns.resolver.Answer:
+        """Resolve a query through the engine, blocking until it completes"""
+        return self.submit(qname, rdtype, lifetime).result()
+
+    def _open_socket(self) -> int:
+        """Open a UDP socket on a fresh ephemeral port and return its id"""
+        family = socket.AF_INET6 if ':' in self.nameservers[0] else socket.AF_INET
+        sock = socket.socket(family, socket.SOCK_DGRAM)
+        sock.setblocking(False)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, SOCKET_BUFFER_SIZE)
+        sock_id = self._next_socket_id
+        self._next_socket_id += 1
+        self._sockets[sock_id] = sock
+        self._socket_queries[sock_id] = 0
+        self._socket_pending[sock_id] = 0
+        self._selector.register(sock, selectors.EVENT_READ, sock_id)
+        return sock_id
+
+    def _pick_socket(self) -> int:
+        """Choose an active socket for a new query, rotating it out once it has sent its share"""
+        sock_id = random.choice(self._active)
+        self._socket_queries[sock_id] += 1
+        if self._socket_queries[sock_id] >= SOCKET_ROTATE_QUERIES:
+            self._active[self._active.index(sock_id)] = self._open_socket()
+            self.stats['socket_rotations'] += 1
+        return sock_id
+
+    def _add_pending(self, pending: _PendingQuery):
+        self._pending[(pending.sock_id, pending.message.id)] = pending
+        self._socket_pending[pending.sock_id] += 1
+
+    def _remove_pending(self, key):
+        """Forget an outstanding query, closing its socket if it was retired and is now idle"""
+        del self._pending[key]
+        sock_id = key[0]
+        self._socket_pending[sock_id] -= 1
+        if self._socket_pending[sock_id] == 0 and sock_id not in self._active:
+            sock = self._sockets.pop(sock_id)
+            self._selector.unregister(sock)
+            sock.close()
+            del self._socket_queries[sock_id]
+            del self._socket_pending[sock_id]
+
+    def _wake(self):
+        """Interrupt the select() call of the I/O thread"""
+        try:
+            self._wakeup_w.send(b'\0')
+        except (OSError, AttributeError):
+            pass
+
+    def _run(self):
+        """I/O loop: send queued queries, read responses, retry expired ones"""
+        while self.running:
+            self._send_outbox()
+
+            timeout = self._next_retry_in()
+            for key, _ in self._selector.select(timeout):
+                if key.data is None:
+                    try:
+                        self._wakeup_r.recv(4096)
+                    except BlockingIOError:
+                        pass
+                else:
+                    self._read_responses(key.data)
+
+            self._check_retries()
+
+    def _send_outbox(self):
+        """Assign IDs to queued queries and send them, up to the outstanding limit"""
+        while self._outbox and len(self._pending) < self.max_outstanding:
+            pending = self._outbox.popleft()
+            pending.sock_id = self._pick_socket()
+            # Pick an unpredictable ID not already outstanding on this socket
+            while True:
+                qid = secrets.randbits(16)
+                if (pending.sock_id, qid) not in self._pending:
+                    break
+            pending.message.id = qid
+            pending.wire = pending.message.to_wire()
+            # The lifetime starts once the query leaves the queue
+            pending.expires_at = time.monotonic() + pending.lifetime
+            self._add_pending(pending)
+            self._send(pending)
+
+    def _send(self, pending: _PendingQuery):
+        """Send (or resend) one query over UDP"""
+        nameserver = self.nameservers[pending.nameserver_index % len(self.nameservers)]
+        pending.attempts += 1
+        pending.retry_at = time.monotonic() + self.query_timeout
+        try:
+            self._sockets[pending.sock_id].sendto(pending.wire, (nameserver, 53))
+            self.stats['sent'] += 1
+        except OSError:
+            # Treat like a lost packet; the retry timer handles it
+            pass
+
+    def _read_responses(self, sock_id: int):
+        """Read every datagram waiting on a socket and complete matching queries"""
+        sock = self._sockets.get(sock_id)
+        if sock is None:
+            return
+        while True:
+            try:
+                wire, address = sock.recvfrom(65535)
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError:
+                return
+
+            try:
+                response = dns.message.from_wire(wire)
+            except Exception:
+                continue
+
+            key = (sock_id, response.id)
+            pending = self._pending.get(key)
+            if pending is None or address[0] not in self.nameservers or address[1] != 53:
+                continue
+            # The question must be echoed exactly, even on errors where is_response() tolerates an empty one
+            if response.question != pending.message.question or not pending.message.is_response(response):
+                self.stats['mismatched'] += 1
+                continue
+
+            self.stats['received'] += 1
+            self._remove_pending(key)
+
+            if response.flags & dns.flags.TC:
+                self.stats['tcp_fallbacks'] += 1
+                self._tcp_executor.submit(self._tcp_fallback, pending, address[0])
+            else:
+                self._complete(pending, response, address[0])
+
+    def _tcp_fallback(self, pending: _PendingQuery, nameserver: str):
+        """Repeat a truncated query over TCP"""
+        try:
+            timeout = max(0.1, pending.expires_at - time.monotonic())
+            response = dns.query.tcp(pending.message, nameserver, timeout=timeout)
+            self._complete(pending, response, nameserver)
+        except Exception as e:
+            pending.future.set_exception(e)
+
+    def _complete(self, pending: _PendingQuery, response: dns.message.Message, nameserver: str):
+        """Turn a response into an Answer or the matching resolver exception"""
+        rcode = response.rcode()
+        try:
+            if rcode == dns.rcode.NXDOMAIN:
+                raise dns.resolver.NXDOMAIN(qnames=[pending.qname], responses={pending.qname: response})
+            if rcode != dns.rcode.NOERROR:
+                raise dns.resolver.NoNameservers(
+                    request=pending.message,
+                    errors=[(nameserver, False, 53, dns.rcode.to_text(rcode), response)]
+                )
+
+            answer = dns.resolver.Answer(pending.qname, pending.rdtype, dns.rdataclass.IN,
+                                         response, nameserver, 53)
+            if answer.rrset is None:
+                raise dns.resolver.NoAnswer(response=response)
+            pending.future.set_result(answer)
+        except Exception as e:
+            pending.future.set_exception(e)
+
+    def _next_retry_in(self) -> float:
+        """Seconds until the earliest retry is due"""
+        if self._outbox and len(self._pending) < self.max_outstanding:
+            return 0
+        if not self._pending:
+            return 1.0
+        earliest = min(p.retry_at for p in self._pending.values())
+        return max(0, earliest - time.monotonic())
+
+    def _check_retries(self):
+        """Resend queries whose response is overdue, failing those out of time"""
+        now = time.monotonic()
+        for key, pending in list(self._pending.items()):
+            if pending.retry_at > now:
+                continue
+            elif pending.attempts > self.retries or now >= pending.expires_at:
+                self._remove_pending(key)
+                self.stats['timeouts'] += 1
+                pending.future.set_exception(dns.exception.Timeout(timeout=pending.lifetime))
+            else:
+                # Move on to the next nameserver for the retry
+                pending.nameserver_index += 1
+                self.stats['retries'] += 1
+                self._send(pending)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get engine counters"""
+        return {
+            'running': self.running,
+            'outstanding': len(self._pending) + len(self._outbox),
+            **self.stats
+        }
+
+# Global bulk DNS engine instance
+bulk_dns_engine = BulkDNSEngine()
@@ -0,0 +1,106 @@
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Dict, Any, Callable, Optional, Tuple
+
+MAX_BLACKLIST_ENTRIES = 200000
+# Upper bound on how long a cached DNSBL answer is trusted, whatever its TTL (seconds)
+MAX_BLACKLIST_TTL = 3600
+
+class BlacklistCache:
+    """
+    Caches DNSBL results per (IP, zone) for the TTL of the answer, and lets concurrent
+    scans of domains sharing an IP wait on a single in-flight query
+    """
+
+    def __init__(self, max_entries: int = MAX_BLACKLIST_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.joined = 0
+
+    def lookup(self, ip: str, zone: str, fetch: Callable[[], Tuple[Tuple, float]]) -> Tuple:
+        """
+        Get the cached result for (ip, zone), or run fetch() once to produce it.
+        fetch returns (result, ttl); a ttl of 0 means the result is not cached.
+        """
+        key = (ip, zone)
+        owner = False
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+
+            future = self._inflight.get(key)
+            if future is not None:
+                self.joined += 1
+            else:
+                self.misses += 1
+                future = self._inflight[key] = Future()
+                owner = True
+
+        if not owner:
+            return future.result()
+
+        try:
+            result, ttl = fetch()
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            if ttl > 0:
+                self._store(key, result, min(ttl, MAX_BLACKLIST_TTL))
+            return result
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def get(self, ip: str, zone: str) -> Optional[Tuple]:
+        """
+        Get the cached result for (ip, zone) without querying, or None
+        """
+        with self._lock:
+            entry = self._entries.get((ip, zone))
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end((ip, zone))
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            return None
+
+    def put(self, ip: str, zone: str, result: Tuple, ttl: float):
+        """
+        Cache a result for (ip, zone) obtained outside lookup()
+        """
+        if ttl > 0:
+            self._store((ip, zone), result, min(ttl, MAX_BLACKLIST_TTL))
+
+    def _store(self, key: Tuple[str, str], result: Tuple, ttl: float):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache size and hit counters"""
+        with self._lock:
+            lookups = self.hits + self.misses + self.joined
+            return {
+                'entries': len(self._entries),
+                'in_flight': len(self._inflight),
+                'hits': self.hits,
+                'misses': self.misses,
+                'joined_in_flight': self.joined,
+                'hit_rate': round((self.hits + self.joined) / lookups, 4) if lookups else 0
+            }
+
+# Global blacklist cache instance
+blacklist_cache = BlacklistCache()
@@ -0,0 +1,260 @@
+import ipaddress
+import mmap
+import os
+import socket
+import threading
+import time
+import heapq
+from array import array
+from bisect import bisect_right
+from typing import Dict, Any, List, Optional, Tuple
+
+DEFAULT_MIRROR_TTL = 2100
+DEFAULT_MIRROR_RESPONSE = '127.0.0.2'
+EXCLUDED = 0xFFFFFFFF
+# Zone files are re-read when their mtime changes, checked at most this often (seconds)
+RELOAD_CHECK_INTERVAL = 60
+
+def _parse_value(value: str, default: Tuple[str, str]) -> Tuple[str, str]:
+    """Parse an rbldnsd ':A:TXT' value, where A may be a single octet ('3' means 127.0.0.3)"""
+    value = value.strip()
+    if not value.startswith(':'):
+        return default
+    parts = value[1:].split(':', 1)
+    address = parts[0].strip() or default[0]
+    if address.isdigit():
+        address = f'127.0.0.{address}'
+    text = parts[1].strip() if len(parts) > 1 else default[1]
+    return address, text
+
+def _ip_to_int(ip: str) -> int:
+    """Convert a dotted-quad IPv4 address to an integer (much faster than ipaddress)"""
+    if ip.count('.') != 3:
+        raise ValueError(f'{ip!r} is not a dotted-quad IPv4 address')
+    try:
+        return int.from_bytes(socket.inet_aton(ip), 'big')
+    except OSError:
+        raise ValueError(f'{ip!r} is not a valid IPv4 address')
+
+def _parse_range(entry: str) -> Tuple[int, int]:
+    """Parse an ip4set entry: address, CIDR, 'a-b' range, or 1-3 octet prefix"""
+    if '-' in entry:
+        first, last = entry.split('-', 1)
+        return _ip_to_int(first), _ip_to_int(last)
+    if '/' in entry:
+        network = ipaddress.IPv4Network(entry, strict=False)
+        return int(network.network_address), int(network.broadcast_address)
+
+    octets = entry.split('.')
+    if len(octets) == 4:
+        address = _ip_to_int(entry)
+        return address, address
+
+    # '10.1' covers 10.1.0.0/16
+    prefix_len = 8 * len(octets)
+    network = ipaddress.IPv4Network('.'.join(octets + ['0'] * (4 - len(octets))) + f'/{prefix_len}')
+    return int(network.network_address), int(network.broadcast_address)
+
+def _flatten(intervals: List[Tuple[int, int, int]]) -> Tuple[array, array, array]:
+    """
+    Turn possibly overlapping (first, last, value) intervals into sorted, disjoint
+    start/end/value arrays; where intervals overlap the most specific (smallest) one wins.
+    A value of EXCLUDED removes the addresses it covers.
+    """
+    starts, ends, values = array('I'), array('I'), array('I')
+    boundaries = sorted({first for first, _, _ in intervals} | {last + 1 for _, last, _ in intervals})
+    intervals = sorted(intervals)
+    active = []
+    next_interval = 0
+
+    for i, point in enumerate(boundaries[:-1]):
+        while next_interval < len(intervals) and intervals[next_interval][0] == point:
+            first, last, value = intervals[next_interval]
+            heapq.heappush(active, (-1 if value == EXCLUDED else last - first, last, value))
+            next_interval += 1
+        # Only the top of the heap matters, so intervals that already ended are dropped lazily
+        while active and active[0][1] < point:
+            heapq.heappop(active)
+        if not active:
+            continue
+
+        _, _, value = active[0]
+        if value == EXCLUDED:
+            continue
+        segment_end = boundaries[i + 1] - 1
+        if ends and ends[-1] == point - 1 and values[-1] == value:
+            ends[-1] = segment_end
+        else:
+            starts.append(point)
+            ends.append(segment_end)
+            values.append(value)
+
+    return starts, ends, values
+
+class ZoneMirror:
+    """
+    A locally mirrored rbldnsd ip4set zone, held as sorted disjoint IP intervals
+    """
+
+    def __init__(self, zone: str, path: str):
+        self.zone = zone
+        self.path = path
+        self.ttl = DEFAULT_MIRROR_TTL
+        self.index = (array('I'), array('I'), array('I'), [])
+        self.entries = 0
+        self.mtime = None
+        self.loaded_at = None
+        self.load_seconds = None
+
+    def load(self):
+        """
+        Read the zone file through mmap and build the interval index
+        """
+        start = time.perf_counter()
+        intervals = []
+        values = []
+        value_ids = {}
+        default = (DEFAULT_MIRROR_RESPONSE, '')
+        ttl = DEFAULT_MIRROR_TTL
+
+        with open(self.path, 'rb') as f:
+            mtime = os.fstat(f.fileno()).st_mtime
+            if os.fstat(f.fileno()).st_size:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    for raw in iter(mapped.readline, b''):
+                        line = raw.decode('ascii', errors='ignore').strip()
+                        if not line or line[0] in '#;':
+                            continue
+                        if line.startswith(':'):
+                            default = _parse_value(line, default)
+                            continue
+                        if line.startswith('$'):
+                            fields = line.split()
+                            if fields[0] == '$TTL' and len(fields) > 1 and fields[1].isdigit():
+                                ttl = int(fields[1])
+                            continue
+
+                        fields = line.split(None, 1)
+                        entry, value = fields[0], fields[1] if len(fields) > 1 else ''
+                        try:
+                            if entry.startswith('!'):
+                                intervals.append(_parse_range(entry[1:]) + (EXCLUDED,))
+                                continue
+                            first, last = _parse_range(entry)
+                        except ValueError:
+                            continue
+
+                        answer = _parse_value(value, default)
+                        if answer not in value_ids:
+                            value_ids[answer] = len(values)
+                            values.append(answer)
+                        intervals.append((first, last, value_ids[answer]))
+
+        starts, ends, value_index = _flatten(intervals)
+
+        # Swap in the new index in one step so concurrent lookups never see a half-built one
+        self.index = (starts, ends, value_index, values)
+        self.entries = len(intervals)
+        self.ttl = ttl
+        self.mtime = mtime
+        self.loaded_at = time.time()
+        self.load_seconds = time.perf_counter() - start
+
+    def lookup(self, ip: str) -> Optional[Tuple[str, str]]:
+        """
+        Get the (A record, TXT) answer for a listed IPv4 address, or None if it is not listed
+        """
+        address = _ip_to_int(ip)
+        starts, ends, value_index, values = self.index
+
+        i = bisect_right(starts, address) - 1
+        if i < 0 or ends[i] < address:
+            return None
+        return values[value_index[i]]
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'zone': self.zone,
+            'path': self.path,
+            'entries': self.entries,
+            'intervals': len(self.index[0]),
+            'ttl': self.ttl,
+            'loaded_at': self.loaded_at,
+            'load_ms': round(self.load_seconds * 1000, 2) if self.load_seconds is not None else None
+        }
+
+class DNSBLMirror:
+    """Answers DNSBL lookups for locally mirrored zones"""
+
+    def __init__(self):
+        self.zones = {}
+        self._lock = threading.Lock()
+        self._last_reload_check = 0.0
+        self.lookups = 0
+
+    def configure(self, mirrors: Optional[Dict[str, str]]):
+        """
+        Load the zone files given as {zone: path}; zones that fail to load fall back to live DNS
+        """
+        zones = {}
+        for zone, path in (mirrors or {}).items():
+            mirror = ZoneMirror(zone, path)
+            try:
+                mirror.load()
+            except (OSError, ValueError) as e:
+                print(f"Could not load DNSBL mirror for {zone} from {path}: {e}")
+                continue
+            print(f"Loaded DNSBL mirror {zone}: {len(mirror.index[0])} intervals in {mirror.load_seconds * 1000:.0f} ms")
+            zones[zone] = mirror
+        with self._lock:
+            self.zones = zones
+
+    def _reload_changed(self):
+        """Re-read zone files that were updated (e.g. by rsync) since they were loaded"""
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last_reload_check < RELOAD_CHECK_INTERVAL:
+                return
+            self._last_reload_check = now
+
+        for mirror in list(self.zones.values()):
+            try:
+                if os.stat(mirror.path).st_mtime != mirror.mtime:
+                    mirror.load()
+            except (OSError, ValueError) as e:
+                print(f"Could not reload DNSBL mirror for {mirror.zone}: {e}")
+
+    def has_zone(self, zone: str) -> bool:
+        """Check whether a zone is answered locally"""
+        return zone in self.zones
+
+    def lookup(self, zone: str, ip: str) -> Optional[Tuple[str, str]]:
+        """
+        Look up an IPv4 address in a mirrored zone
+        """
+        self._reload_changed()
+        self.lookups += 1
+        return self.zones[zone].lookup(ip)
+
+    def lookup_many(self, zone: str, ips: List[str]) -> Dict[str, Tuple[str, str]]:
+        """
+        Look up many IPv4 addresses in a mirrored zone, returning only the listed ones
+        """
+        self._reload_changed()
+        mirror = self.zones[zone]
+        listed = {}
+        for ip in ips:
+            answer = mirror.lookup(ip)
+            if answer is not None:
+                listed[ip] = answer
+        self.lookups += len(ips)
+        return listed
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'lookups': self.lookups,
+            'zones': {zone: mirror.get_stats() for zone, mirror in self.zones.items()}
+        }
+
+# Global DNSBL mirror instance
+dnsbl_mirror = DNSBLMirror()
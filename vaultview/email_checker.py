@@ -1,15 +1,28 @@
 import dns.resolver
 import socket
 import smtplib
-import ssl
 import json
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Callable, Optional, Tuple
 from datetime import datetime
 import re
+import time
+import functools
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from vaultview.dns_cache import resolve
+from vaultview.tls_context import tls_context_manager
+from vaultview.smtp_cache import smtp_probe_cache
+from vaultview.spf import evaluate_spf
+from vaultview.dkim import detect_mail_provider, discover_dkim_selectors
 
-def check_email(domain: str) -> str:
+# MX hosts probed per domain
+SMTP_MAX_HOSTS = 3
+# Per-connection timeout and overall deadline for the SMTP tests (seconds)
+SMTP_TIMEOUT = 10
+SMTP_DEADLINE = 15
+
+def check_email(domain: str, engine=None) -> str:
     """
-    Comprehensive email/SMTP diagnostics for a domain
+    Comprehensive email/SMTP diagnostics for a domain; bulk jobs pass their pipelined DNS engine
     """
     try:
         results = {
@@ -22,21 +35,24 @@ def check_email(domain: str) -> str:
             'recommendations': []
         }
         
-        # 1. Check MX Records
-        mx_results = check_mx_records(domain)
-        results['mx_records'] = mx_results['records']
-        results['mx_status'] = mx_results['status']
-        
-        # 2. Check Security Records (SPF, DKIM, DMARC)
-        security_results = check_security_records(domain)
-        results['security_records'] = security_results
+        # 1-3. MX lookup -> SMTP tests runs alongside the SPF, DKIM and DMARC lookups
+        outputs, results['timings'] = run_phase_pipeline({
+            'mx': ([], lambda: check_mx_records(domain, engine)),
+            'spf': ([], lambda: check_spf_record(domain, engine)),
+            'dkim': (['mx'], lambda mx: check_dkim_records(domain, mx['records'], engine)),
+            'dmarc': ([], lambda: check_dmarc_record(domain, engine)),
+            'smtp': (['mx'], lambda mx: test_smtp_connections(domain, mx['records'])
+                     if mx['records'] else {'error': 'No MX records found'})
+        })
         
-        # 3. Test SMTP Connections
-        if mx_results['records']:
-            smtp_results = test_smtp_connections(domain, mx_results['records'])
-            results['smtp_tests'] = smtp_results
-        else:
-            results['smtp_tests'] = {'error': 'No MX records found'}
+        results['mx_records'] = outputs['mx']['records']
+        results['mx_status'] = outputs['mx']['status']
+        results['security_records'] = {
+            'spf': outputs['spf'],
+            'dkim': outputs['dkim'],
+            'dmarc': outputs['dmarc']
+        }
+        results['smtp_tests'] = outputs['smtp']
         
         # 4. Calculate Overall Score
         score = calculate_email_score(results)
@@ -53,18 +69,62 @@ def check_email(domain: str) -> str:
             'error': f'Unexpected error checking email for {domain}: {str(e)}'
         })
 
-def check_mx_records(domain: str) -> Dict[str, Any]:
+def run_phase_pipeline(phases: Dict[str, Tuple[List[str], Callable[..., Any]]]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    Run phases given as {name: (dependencies, function)}, each as soon as its dependencies
+    have finished. A function receives its dependencies' outputs as keyword arguments.
+    Returns the outputs and per-phase timings in milliseconds.
+    """
+    outputs = {}
+    timings = {}
+    pipeline_start = time.perf_counter()
+    
+    def run(name, function, kwargs):
+        start = time.perf_counter()
+        output = function(**kwargs)
+        timings[name] = {
+            'start_ms': round((start - pipeline_start) * 1000, 2),
+            'duration_ms': round((time.perf_counter() - start) * 1000, 2)
+        }
+        return output
+    
+    remaining = dict(phases)
+    running = {}
+    with ThreadPoolExecutor(max_workers=len(phases)) as executor:
+        while remaining or running:
+            for name, (dependencies, function) in list(remaining.items()):
+                if all(dependency in outputs for dependency in dependencies):
+                    del remaining[name]
+                    kwargs = {dependency: outputs[dependency] for dependency in dependencies}
+                    running[executor.submit(run, name, function, kwargs)] = name
+            
+            if not running:
+                raise ValueError(f'Unsatisfiable phase dependencies: {sorted(remaining)}')
+            
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                outputs[running.pop(future)] = future.result()
+    
+    timings = {name: timings[name] for name in phases}
+    timings['total_ms'] = round((time.perf_counter() - pipeline_start) * 1000, 2)
+    return outputs, timings
+
+def check_mx_records(domain: str, engine=None) -> Dict[str, Any]:
     """Check MX records for a domain"""
     try:
-        mx_records = dns.resolver.resolve(domain, 'MX')
+        mx_records = resolve(domain, 'MX', engine=engine)
         records = []
         
-        for record in mx_records:
-            records.append({
-                'priority': record.preference,
-                'server': str(record.exchange),
-                'resolved': resolve_mx_ip(str(record.exchange))
-            })
+        # Resolve every MX host at once
+        with ThreadPoolExecutor(max_workers=max(1, len(mx_records))) as executor:
+            addresses = executor.map(lambda server: resolve_mx_ip(server, engine),
+                                     [str(record.exchange) for record in mx_records])
+            for record, address in zip(mx_records, addresses):
+                records.append({
+                    'priority': record.preference,
+                    'server': str(record.exchange),
+                    'resolved': address
+                })
         
         # Sort by priority
         records.sort(key=lambda x: x['priority'])
@@ -82,10 +142,10 @@ def check_mx_records(domain: str) -> Dict[str, Any]:
     except Exception as e:
         return {'status': f'Error: {str(e)}', 'count': 0, 'records': []}
 
-def resolve_mx_ip(mx_server: str) -> str:
+def resolve_mx_ip(mx_server: str, engine=None) -> str:
     """Resolve IP address for MX server"""
     try:
-        answers = dns.resolver.resolve(mx_server, 'A')
+        answers = resolve(mx_server, 'A', engine=engine)
         return str(answers[0])
     except:
         return 'Unresolved'
@@ -99,10 +159,10 @@ def check_security_records(domain: str) -> Dict[str, Any]:
     }
     return results
 
-def check_spf_record(domain: str) -> Dict[str, Any]:
+def check_spf_record(domain: str, engine=None) -> Dict[str, Any]:
     """Check SPF record"""
     try:
-        txt_records = dns.resolver.resolve(domain, 'TXT')
+        txt_records = resolve(domain, 'TXT', engine=engine)
         
         for record in txt_records:
             record_str = str(record)
@@ -123,11 +183,13 @@ def check_spf_record(domain: str) -> Dict[str, Any]:
                     else:
                         mechanisms.append(part)
                 
+                # Expand includes/redirects/a/mx to count DNS lookups and flatten the allowed IPs
                 return {
                     'found': True,
                     'record': record_str.strip('"'),
                     'mechanisms': mechanisms,
-                    'status': 'Valid'
+                    'status': 'Valid',
+                    **evaluate_spf(domain, engine)
                 }
         
         return {'found': False, 'status': 'Not Found'}
@@ -139,43 +201,30 @@ def check_spf_record(domain: str) -> Dict[str, Any]:
     except Exception as e:
         return {'found': False, 'status': f'Error: {str(e)}'}
 
-def check_dkim_records(domain: str) -> Dict[str, Any]:
-    """Check DKIM records (common selectors)"""
-    common_selectors = ['default', 'google', 'selector1', 'selector2', 'k1', 'mail']
-    dkim_records = []
-    
-    for selector in common_selectors:
-        try:
-            dkim_domain = f"{selector}._domainkey.{domain}"
-            txt_records = dns.resolver.resolve(dkim_domain, 'TXT')
-            
-            for record in txt_records:
-                record_str = str(record)
-                if 'v=DKIM1' in record_str:
-                    dkim_records.append({
-                        'selector': selector,
-                        'record': record_str.strip('"'),
-                        'status': 'Valid'
-                    })
-                    break
-                    
-        except (dns.resolver.NXDOMAIN, dns.resolver.NoAnswer):
-            continue
-        except Exception:
-            continue
+def check_dkim_records(domain: str, mx_records: Optional[List[Dict[str, Any]]] = None,
+                       engine=None) -> Dict[str, Any]:
+    """Check DKIM records, probing selectors for the detected mail provider first"""
+    provider = detect_mail_provider(mx_records)
+    discovery = discover_dkim_selectors(domain, provider, engine)
+    dkim_records = discovery.pop('records')
+    revoked = discovery.pop('revoked')
     
     return {
         'found': len(dkim_records) > 0,
         'count': len(dkim_records),
         'records': dkim_records,
-        'status': 'Found' if dkim_records else 'Not Found'
+        'status': 'Found' if dkim_records else ('Revoked' if revoked else 'Not Found'),
+        'revoked': revoked,
+        'revoked_count': len(revoked),
+        'provider': provider,
+        **discovery
     }
 
-def check_dmarc_record(domain: str) -> Dict[str, Any]:
+def check_dmarc_record(domain: str, engine=None) -> Dict[str, Any]:
     """Check DMARC record"""
     try:
         dmarc_domain = f"_dmarc.{domain}"
-        txt_records = dns.resolver.resolve(dmarc_domain, 'TXT')
+        txt_records = resolve(dmarc_domain, 'TXT', engine=engine)
         
         for record in txt_records:
             record_str = str(record)
@@ -209,79 +258,149 @@ def check_dmarc_record(domain: str) -> Dict[str, Any]:
 def test_smtp_connections(domain: str, mx_records: List[Dict]) -> Dict[str, Any]:
     """Test SMTP connections to MX servers"""
     results = {}
+    deadline = time.monotonic() + SMTP_DEADLINE
     
-    for mx_record in mx_records[:3]:  # Test top 3 MX servers
-        server = mx_record['server']
-        ip = mx_record['resolved']
-        
-        if ip == 'Unresolved':
-            results[server] = {'status': 'Unresolved IP', 'error': 'Cannot resolve IP'}
-            continue
-        
-        server_results = {
-            'ip': ip,
-            'priority': mx_record['priority'],
-            'tests': {}
-        }
+    # One SMTP session (port 25) and one SMTPS probe (port 465) per MX host, all at once
+    executor = ThreadPoolExecutor(max_workers=SMTP_MAX_HOSTS * 2)
+    try:
+        futures = {}
+        for mx_record in mx_records[:SMTP_MAX_HOSTS]:  # Test top 3 MX servers
+            server = mx_record['server']
+            ip = mx_record['resolved']
+            
+            if ip == 'Unresolved':
+                results[server] = {'status': 'Unresolved IP', 'error': 'Cannot resolve IP'}
+                continue
+            
+            results[server] = {
+                'ip': ip,
+                'priority': mx_record['priority'],
+                'tests': {}
+            }
+            # Results are shared per MX host/IP, so domains on the same mail provider reuse them
+            hostname = server.rstrip('.').lower()
+            futures[server] = (
+                executor.submit(smtp_probe_cache.lookup, (hostname, ip, 25),
+                                functools.partial(probe_smtp_session, hostname, ip, SMTP_TIMEOUT)),
+                executor.submit(smtp_probe_cache.lookup, (hostname, ip, 465),
+                                functools.partial(probe_smtps, hostname, ip, SMTP_TIMEOUT))
+            )
         
-        # Test SMTP connection
-        try:
-            with socket.create_connection((ip, 25), timeout=10) as sock:
-                server_results['tests']['smtp_25'] = {
-                    'status': 'Connected',
-                    'banner': sock.recv(1024).decode('utf-8', errors='ignore').strip()
-                }
-        except Exception as e:
-            server_results['tests']['smtp_25'] = {
+        wait([f for pair in futures.values() for f in pair], timeout=max(0, deadline - time.monotonic()))
+    finally:
+        executor.shutdown(wait=False)
+    
+    for server, (session, smtps) in futures.items():
+        tests = results[server]['tests']
+        cached = True
+        if session.done():
+            session_tests, from_cache = session.result()
+            tests.update(session_tests)
+            cached = cached and from_cache
+        else:
+            timed_out = {'status': 'Failed', 'error': f'Timed out after {SMTP_DEADLINE:g} seconds'}
+            tests['smtp_25'] = timed_out
+            tests['starttls'] = timed_out
+            cached = False
+        if smtps.done():
+            tests['smtp_ssl'], from_cache = smtps.result()
+            cached = cached and from_cache
+        else:
+            tests['smtp_ssl'] = {
                 'status': 'Failed',
-                'error': str(e)
+                'error': f'Timed out after {SMTP_DEADLINE:g} seconds'
             }
+            cached = False
+        results[server]['cached'] = cached
+    
+    return results
+
+def _read_smtp_reply(reader) -> Tuple[int, str]:
+    """Read a (possibly multi-line) SMTP reply"""
+    lines = []
+    while True:
+        line = reader.readline()
+        if not line:
+            raise ConnectionError('SMTP connection closed')
+        text = line.decode('utf-8', errors='ignore').rstrip()
+        lines.append(text)
+        if len(text) < 4 or text[3] != '-':
+            return int(text[:3]), '\n'.join(lines)
+
+def probe_smtp_session(server: str, ip: str, timeout: float = SMTP_TIMEOUT) -> Dict[str, Any]:
+    """
+    Run one SMTP session on port 25: read the banner, send EHLO and upgrade with STARTTLS
+    """
+    tests = {}
+    try:
+        sock = socket.create_connection((ip, 25), timeout=timeout)
+    except Exception as e:
+        failed = {'status': 'Failed', 'error': str(e)}
+        return {'smtp_25': failed, 'starttls': failed}
+    
+    try:
+        reader = sock.makefile('rb')
+        code, banner = _read_smtp_reply(reader)
+        tests['smtp_25'] = {
+            'status': 'Connected',
+            'banner': banner.strip()
+        }
         
-        # Test SMTP with STARTTLS
-        try:
-            with socket.create_connection((ip, 25), timeout=10) as sock:
-                # Read banner
-                banner = sock.recv(1024).decode('utf-8', errors='ignore')
-                
-                # Send EHLO
-                sock.send(b'EHLO test.com\r\n')
-                response = sock.recv(1024).decode('utf-8', errors='ignore')
-                
-                if 'STARTTLS' in response:
-                    server_results['tests']['starttls'] = {
-                        'status': 'Supported',
-                        'banner': banner.strip()
-                    }
-                else:
-                    server_results['tests']['starttls'] = {
-                        'status': 'Not Supported',
-                        'banner': banner.strip()
-                    }
-        except Exception as e:
-            server_results['tests']['starttls'] = {
-                'status': 'Failed',
-                'error': str(e)
+        sock.sendall(b'EHLO vaultview.local\r\n')
+        code, ehlo = _read_smtp_reply(reader)
+        if code != 250 or 'STARTTLS' not in ehlo.upper():
+            tests['starttls'] = {
+                'status': 'Not Supported',
+                'banner': banner.strip()
             }
+            sock.sendall(b'QUIT\r\n')
+            return tests
+        
+        tests['starttls'] = {
+            'status': 'Supported',
+            'banner': banner.strip()
+        }
+        
+        # Finish the upgrade to see whether the certificate actually verifies
+        sock.sendall(b'STARTTLS\r\n')
+        code, reply = _read_smtp_reply(reader)
+        reader.close()
+        if code != 220:
+            tests['starttls']['tls_handshake'] = f'Rejected: {reply}'
+            return tests
         
-        # Test SMTP over SSL
         try:
-            context = ssl.create_default_context()
-            with socket.create_connection((ip, 465), timeout=10) as sock:
-                with context.wrap_socket(sock, server_hostname=server) as ssock:
-                    banner = ssock.recv(1024).decode('utf-8', errors='ignore')
-                    server_results['tests']['smtp_ssl'] = {
-                        'status': 'Connected',
-                        'banner': banner.strip()
-                    }
+            ssock = tls_context_manager.wrap_socket(sock, server, 25)
+            sock = ssock
+            tests['starttls']['tls_handshake'] = 'Verified'
+            tests['starttls']['tls_version'] = ssock.version()
+            ssock.sendall(b'QUIT\r\n')
         except Exception as e:
-            server_results['tests']['smtp_ssl'] = {
-                'status': 'Failed',
-                'error': str(e)
-            }
-        
-        results[server] = server_results
+            tests['starttls']['tls_handshake'] = f'Failed: {str(e)}'
+    except Exception as e:
+        tests.setdefault('smtp_25', {'status': 'Failed', 'error': str(e)})
+        tests.setdefault('starttls', {'status': 'Failed', 'error': str(e)})
+    finally:
+        sock.close()
     
-    return results
+    return tests
+
+def probe_smtps(server: str, ip: str, timeout: float = SMTP_TIMEOUT) -> Dict[str, Any]:
+    """
+    Test SMTP over SSL (port 465)
+    """
+    try:
+        with tls_context_manager.connect(ip, 465, timeout=timeout, server_hostname=server) as ssock:
+            banner = ssock.recv(1024).decode('utf-8', errors='ignore')
+            return {
+                'status': 'Connected',
+                'banner': banner.strip()
+            }
+    except Exception as e:
+        return {
+            'status': 'Failed',
+            'error': str(e)
+        }
 
 def calculate_email_score(results: Dict) -> int:
     """Calculate overall email security score (0-100)"""
@@ -340,8 +459,17 @@ def generate_recommendations(results: Dict) -> List[str]:
     if not results['security_records']['spf']['found']:
         recommendations.append("Add SPF record to prevent email spoofing")
     
+    if results['security_records']['spf'].get('exceeds_lookup_limit'):
+        recommendations.append(
+            f"SPF record needs {results['security_records']['spf']['lookup_count']} DNS lookups; "
+            "flatten includes to stay within the limit of 10"
+        )
+    
     if not results['security_records']['dkim']['found']:
-        recommendations.append("Add DKIM record for email authentication")
+        if results['security_records']['dkim'].get('revoked'):
+            recommendations.append("Every DKIM key found has been revoked; publish a new DKIM key")
+        else:
+            recommendations.append("Add DKIM record for email authentication")
     
     if not results['security_records']['dmarc']['found']:
         recommendations.append("Add DMARC record to monitor email authentication")
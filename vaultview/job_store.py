@@ -0,0 +1,314 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Any, List, Optional, Tuple
+
+# Used until configure() is called: instance/bulk_jobs.db in the project root
+DEFAULT_JOB_DB = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'instance', 'bulk_jobs.db')
+# Seconds a writer waits for another process's transaction before giving up
+BUSY_TIMEOUT = 30
+# A running job refreshes its lease this often; a job whose lease is older than
+# LEASE_TIMEOUT is treated as interrupted and may be resumed by another process (seconds)
+HEARTBEAT_INTERVAL = 10
+LEASE_TIMEOUT = 60
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS bulk_jobs (
+    id TEXT PRIMARY KEY,
+    user_id INTEGER NOT NULL,
+    scan_types TEXT NOT NULL,
+    status TEXT NOT NULL,
+    total_domains INTEGER NOT NULL,
+    total_scans INTEGER NOT NULL,
+    completed_scans INTEGER NOT NULL DEFAULT 0,
+    failed_scans INTEGER NOT NULL DEFAULT 0,
+    save_results INTEGER NOT NULL DEFAULT 1,
+    send_notifications INTEGER NOT NULL DEFAULT 1,
+    created_at TEXT NOT NULL,
+    started_at TEXT,
+    completed_at TEXT,
+    error TEXT,
+    concurrency TEXT,
+    worker TEXT,
+    heartbeat_at REAL
+);
+CREATE TABLE IF NOT EXISTS bulk_tasks (
+    job_id TEXT NOT NULL,
+    domain_index INTEGER NOT NULL,
+    domain TEXT NOT NULL,
+    scan_type TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    worker TEXT,
+    result TEXT,
+    finished_at TEXT,
+    PRIMARY KEY (job_id, scan_type, domain_index)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS ix_bulk_tasks_status ON bulk_tasks (job_id, scan_type, status, domain_index);
+CREATE INDEX IF NOT EXISTS ix_bulk_jobs_status ON bulk_jobs (status, created_at);
+"""
+
+JOB_COLUMNS = (
+    'id', 'user_id', 'scan_types', 'status', 'total_domains', 'total_scans', 'completed_scans',
+    'failed_scans', 'save_results', 'send_notifications', 'created_at', 'started_at',
+    'completed_at', 'error', 'concurrency', 'worker', 'heartbeat_at'
+)
+
+# Columns added after the first version of the schema, with their definitions
+ADDED_JOB_COLUMNS = {
+    'worker': 'TEXT',
+    'heartbeat_at': 'REAL'
+}
+
+class JobStore:
+    """
+    SQLite store for bulk jobs and their per-(domain, scan type) tasks, shared by every
+    worker process. Jobs keep running counters, so status reads are a single row lookup.
+    """
+
+    def __init__(self, path: str = DEFAULT_JOB_DB):
+        self.path = path
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._initialized = set()
+
+    def configure(self, path: Optional[str] = None):
+        """Point the store at a database file (connections are opened lazily)"""
+        if path:
+            with self._lock:
+                self.path = path
+
+    def _connection(self) -> sqlite3.Connection:
+        """Get this thread's connection to the current database, creating the schema once"""
+        path = self.path
+        connections = getattr(self._local, 'connections', None)
+        if connections is None:
+            connections = self._local.connections = {}
+        connection = connections.get(path)
+        if connection is not None:
+            return connection
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Autocommit mode: multi-statement writes use explicit BEGIN IMMEDIATE transactions
+        connection = sqlite3.connect(path, timeout=BUSY_TIMEOUT, isolation_level=None, check_same_thread=False)
+        connection.row_factory = sqlite3.Row
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.execute('PRAGMA synchronous=NORMAL')
+        with self._lock:
+            if path not in self._initialized:
+                connection.executescript(SCHEMA)
+                existing = {row['name'] for row in connection.execute('PRAGMA table_info(bulk_jobs)')}
+                for column, definition in ADDED_JOB_COLUMNS.items():
+                    if column not in existing:
+                        connection.execute(f'ALTER TABLE bulk_jobs ADD COLUMN {column} {definition}')
+                self._initialized.add(path)
+        connections[path] = connection
+        return connection
+
+    @contextmanager
+    def _transaction(self):
+        """BEGIN IMMEDIATE ... COMMIT, rolling back on error"""
+        connection = self._connection()
+        # Take the write lock up front so concurrent claims cannot pick the same tasks
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            yield connection
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        connection.execute('COMMIT')
+
+    @staticmethod
+    def _job_from_row(row: sqlite3.Row) -> Dict[str, Any]:
+        job = dict(row)
+        job['scan_types'] = json.loads(job['scan_types'])
+        job['save_results'] = bool(job['save_results'])
+        job['send_notifications'] = bool(job['send_notifications'])
+        job['concurrency'] = json.loads(job['concurrency']) if job['concurrency'] else {}
+        return job
+
+    def create_job(self, job: Dict[str, Any], domains: List[str]):
+        """Insert a job row and one pending task per (domain, scan type)"""
+        row = dict(job, scan_types=json.dumps(job['scan_types']), concurrency=None)
+        with self._transaction() as connection:
+            connection.execute(
+                f"INSERT INTO bulk_jobs ({', '.join(JOB_COLUMNS)}) VALUES ({', '.join('?' * len(JOB_COLUMNS))})",
+                [row.get(column) for column in JOB_COLUMNS]
+            )
+            connection.executemany(
+                'INSERT INTO bulk_tasks (job_id, domain_index, domain, scan_type) VALUES (?, ?, ?, ?)',
+                ((job['id'], index, domain, scan_type)
+                 for scan_type in job['scan_types'] for index, domain in enumerate(domains))
+            )
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Get a job row, or None"""
+        row = self._connection().execute('SELECT * FROM bulk_jobs WHERE id = ?', (job_id,)).fetchone()
+        return self._job_from_row(row) if row is not None else None
+
+    def get_status(self, job_id: str) -> Optional[str]:
+        row = self._connection().execute('SELECT status FROM bulk_jobs WHERE id = ?', (job_id,)).fetchone()
+        return row['status'] if row is not None else None
+
+    def update_job(self, job_id: str, **fields):
+        """Set job columns, e.g. update_job(job_id, status='completed')"""
+        if 'concurrency' in fields:
+            fields['concurrency'] = json.dumps(fields['concurrency'])
+        assignments = ', '.join(f'{column} = ?' for column in fields if column in JOB_COLUMNS)
+        self._connection().execute(
+            f'UPDATE bulk_jobs SET {assignments} WHERE id = ?',
+            [value for column, value in fields.items() if column in JOB_COLUMNS] + [job_id]
+        )
+
+    def transition(self, job_id: str, from_statuses: Tuple[str, ...], holder: Optional[str] = None,
+                   **fields) -> bool:
+        """
+        Update a job only while its status is one of from_statuses (and, given a holder, while
+        that worker still holds its lease); returns whether it changed
+        """
+        assignments = ', '.join(f'{column} = ?' for column in fields)
+        condition = f"id = ? AND status IN ({', '.join('?' * len(from_statuses))})"
+        params = list(fields.values()) + [job_id] + list(from_statuses)
+        if holder is not None:
+            condition += ' AND worker = ?'
+            params.append(holder)
+        cursor = self._connection().execute(f'UPDATE bulk_jobs SET {assignments} WHERE {condition}', params)
+        return cursor.rowcount > 0
+
+    def claim_tasks(self, job_id: str, scan_type: str, limit: int, worker: str) -> List[Tuple[int, str]]:
+        """
+        Atomically mark up to `limit` pending tasks of a scan type as running for this worker,
+        returning their (domain index, domain)
+        """
+        with self._transaction() as connection:
+            rows = connection.execute(
+                "SELECT domain_index, domain FROM bulk_tasks WHERE job_id = ? AND scan_type = ? AND status = 'pending' "
+                'ORDER BY domain_index LIMIT ?',
+                (job_id, scan_type, limit)
+            ).fetchall()
+            connection.executemany(
+                "UPDATE bulk_tasks SET status = 'running', worker = ? WHERE job_id = ? AND scan_type = ? AND domain_index = ?",
+                ((worker, job_id, scan_type, row['domain_index']) for row in rows)
+            )
+        return [(row['domain_index'], row['domain']) for row in rows]
+
+    def complete_tasks(self, job_id: str, completions: List[Tuple[int, str, Dict[str, Any], bool]],
+                       finished_at: str, worker: str, concurrency: Optional[Dict[str, Any]] = None) -> Tuple[int, int]:
+        """
+        Checkpoint (domain index, scan type, result, failed) for tasks this worker finished and
+        bump the job's counters in the same transaction; returns the new (completed, failed) counts.
+        Tasks no longer claimed by this worker (e.g. taken over after a lost lease) are not counted.
+        """
+        counts = {}
+        with self._transaction() as connection:
+            for status in ('success', 'error'):
+                cursor = connection.executemany(
+                    'UPDATE bulk_tasks SET status = ?, result = ?, finished_at = ? '
+                    "WHERE job_id = ? AND scan_type = ? AND domain_index = ? AND status = 'running' AND worker = ?",
+                    ((status, json.dumps(result, default=str), finished_at, job_id, scan_type, index, worker)
+                     for index, scan_type, result, is_failed in completions
+                     if is_failed == (status == 'error'))
+                )
+                counts[status] = max(cursor.rowcount, 0)
+            connection.execute(
+                'UPDATE bulk_jobs SET completed_scans = completed_scans + ?, failed_scans = failed_scans + ?, '
+                'concurrency = COALESCE(?, concurrency) WHERE id = ?',
+                (counts['success'] + counts['error'], counts['error'],
+                 json.dumps(concurrency) if concurrency is not None else None, job_id)
+            )
+            row = connection.execute(
+                'SELECT completed_scans, failed_scans FROM bulk_jobs WHERE id = ?', (job_id,)
+            ).fetchone()
+        return row['completed_scans'], row['failed_scans']
+
+    def release_tasks(self, job_id: str, worker: str) -> int:
+        """Return tasks a worker claimed but did not finish to the pending pool"""
+        cursor = self._connection().execute(
+            "UPDATE bulk_tasks SET status = 'pending', worker = NULL WHERE job_id = ? AND worker = ? AND status = 'running'",
+            (job_id, worker)
+        )
+        return cursor.rowcount
+
+    def heartbeat(self, job_id: str, worker: str) -> bool:
+        """Renew a worker's lease on a job; False means another process has taken it over"""
+        cursor = self._connection().execute(
+            'UPDATE bulk_jobs SET heartbeat_at = ? WHERE id = ? AND worker = ?',
+            (time.time(), job_id, worker)
+        )
+        return cursor.rowcount > 0
+
+    def get_unfinished_jobs(self) -> List[Dict[str, Any]]:
+        """Pending or processing jobs with their lease holder and last heartbeat"""
+        rows = self._connection().execute(
+            "SELECT id, worker, heartbeat_at FROM bulk_jobs WHERE status IN ('pending', 'processing') ORDER BY created_at"
+        )
+        return [dict(row) for row in rows]
+
+    def acquire_job(self, job_id: str, worker: str, previous_worker: Optional[str] = None,
+                    lease_timeout: float = LEASE_TIMEOUT) -> bool:
+        """
+        Take over an interrupted job whose lease expired, or that is still held by
+        previous_worker (known to be gone). Only one process wins; the job's abandoned
+        claims go back to the pending pool, while finished tasks keep their results.
+        """
+        now = time.time()
+        with self._transaction() as connection:
+            cursor = connection.execute(
+                "UPDATE bulk_jobs SET worker = ?, heartbeat_at = ? WHERE id = ? AND status IN ('pending', 'processing') "
+                'AND (heartbeat_at IS NULL OR heartbeat_at < ? OR worker IS ?)',
+                (worker, now, job_id, now - lease_timeout, previous_worker)
+            )
+            if cursor.rowcount == 0:
+                return False
+            connection.execute(
+                "UPDATE bulk_tasks SET status = 'pending', worker = NULL WHERE job_id = ? AND status = 'running'",
+                (job_id,)
+            )
+        return True
+
+    def get_domain_results(self, job_id: str) -> List[Dict[str, Any]]:
+        """
+        Assemble per-domain results from finished tasks, in the order the domains were submitted
+        """
+        rows = self._connection().execute(
+            "SELECT domain_index, domain, scan_type, status, result FROM bulk_tasks "
+            "WHERE job_id = ? AND status IN ('success', 'error') ORDER BY domain_index",
+            (job_id,)
+        )
+        results = []
+        current_index = None
+        for row in rows:
+            if row['domain_index'] != current_index:
+                current_index = row['domain_index']
+                results.append({
+                    'domain': row['domain'],
+                    'scans': {},
+                    'status': 'completed',
+                    'errors': []
+                })
+            domain_result = results[-1]
+            scan_result = json.loads(row['result'])
+            domain_result['scans'][row['scan_type']] = scan_result
+            if row['status'] == 'error':
+                domain_result['errors'].append(f"{row['scan_type']}: {scan_result.get('error')}")
+                domain_result['status'] = 'partial'
+        return results
+
+    def delete_jobs(self, statuses: Tuple[str, ...], created_before: str) -> int:
+        """Delete jobs in the given statuses created before an ISO timestamp, with their tasks"""
+        placeholders = ', '.join('?' * len(statuses))
+        with self._transaction() as connection:
+            job_ids = [row['id'] for row in connection.execute(
+                f'SELECT id FROM bulk_jobs WHERE status IN ({placeholders}) AND created_at < ?',
+                list(statuses) + [created_before]
+            )]
+            connection.executemany('DELETE FROM bulk_tasks WHERE job_id = ?', ((job_id,) for job_id in job_ids))
+            connection.executemany('DELETE FROM bulk_jobs WHERE id = ?', ((job_id,) for job_id in job_ids))
+        return len(job_ids)
+
+# Global job store instance
+job_store = JobStore()
@@ -14,4 +14,33 @@ class ScanResult(db.Model):
     result_type = db.Column(db.String(50), nullable=False)  # 'SSL' or 'DNS'
     result_data = db.Column(db.Text, nullable=False)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
-    timestamp = db.Column(db.DateTime, default=get_ist_now, nullable=False) 
\ No newline at end of file
+    timestamp = db.Column(db.DateTime, default=get_ist_now, nullable=False)
+    # SSL rows reference a deduplicated certificate; result_data keeps only per-scan observations
+    cert_fingerprint = db.Column(db.String(64), db.ForeignKey('certificate.fingerprint_sha256'), index=True, nullable=True)
+
+class Certificate(db.Model):
+    fingerprint_sha256 = db.Column(db.String(64), primary_key=True)
+    subject = db.Column(db.String(255))
+    issuer = db.Column(db.String(255))
+    valid_from = db.Column(db.DateTime)
+    valid_until = db.Column(db.DateTime)
+    serial_number = db.Column(db.String(128))
+    version = db.Column(db.Integer)
+    der = db.Column(db.LargeBinary, nullable=True)
+    first_seen = db.Column(db.DateTime, default=get_ist_now, nullable=False) 
+
+class CertificateExpiry(db.Model):
+    # Latest certificate per user and domain, indexed for "expiring within N days" queries
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'domain', name='uq_certificate_expiry_user_domain'),
+        db.Index('ix_certificate_expiry_user_not_after', 'user_id', 'not_after'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    domain = db.Column(db.String(255), nullable=False)
+    not_after = db.Column(db.DateTime, nullable=False)
+    issuer = db.Column(db.String(255))
+    cert_fingerprint = db.Column(db.String(64), db.ForeignKey('certificate.fingerprint_sha256'))
+    scan_result_id = db.Column(db.Integer, db.ForeignKey('scan_result.id'))
+    updated_at = db.Column(db.DateTime, default=get_ist_now, nullable=False)
\ No newline at end of file
@@ -2,7 +2,8 @@ import json
 from datetime import datetime, timedelta
 from typing import List, Dict, Any
 from vaultview.models import ScanResult, User
-from vaultview.utils import format_scan_result, get_ssl_status_color
+from vaultview.utils import format_scan_result, get_ssl_status_color, get_ist_now
+from vaultview.cert_store import get_certificate_expiries
 
 class ReportGenerator:
     def __init__(self):
@@ -12,12 +13,13 @@ class ReportGenerator:
         """
         Generate a comprehensive report for a user
         """
-        since_date = datetime.now() - timedelta(days=days)
+        # Scan timestamps are stored in IST
+        since_date = get_ist_now() - timedelta(days=days)
         
         # Get user's scan results
         scan_results = ScanResult.query.filter(
             ScanResult.user_id == user_id,
-            ScanResult.id >= since_date
+            ScanResult.timestamp >= since_date
         ).order_by(ScanResult.id.desc()).all()
         
         # Separate SSL and DNS results
@@ -25,7 +27,7 @@ class ReportGenerator:
         dns_results = [r for r in scan_results if r.result_type == 'DNS']
         
         # Analyze SSL certificates
-        ssl_analysis = self._analyze_ssl_results(ssl_results)
+        ssl_analysis = self._analyze_ssl_results(user_id, ssl_results)
         
         # Analyze DNS records
         dns_analysis = self._analyze_dns_results(dns_results)
@@ -46,42 +48,38 @@ class ReportGenerator:
             'recent_results': scan_results[:10]  # Last 10 results
         }
     
-    def _analyze_ssl_results(self, ssl_results: List[ScanResult]) -> Dict[str, Any]:
+    def _analyze_ssl_results(self, user_id: int, ssl_results: List[ScanResult]) -> Dict[str, Any]:
         """
-        Analyze SSL certificate results
+        Analyze the current certificates, from the certificate expiry table, of the domains
+        SSL-scanned within the report period
         """
+        scanned_domains = set(r.domain for r in ssl_results)
+        expiries = [e for e in get_certificate_expiries(user_id) if e['domain'] in scanned_domains]
+        
         analysis = {
-            'total_certificates': len(ssl_results),
+            'total_certificates': len(expiries),
             'valid_certificates': 0,
             'expired_certificates': 0,
             'expiring_soon': 0,
             'domains': {}
         }
         
-        for result in ssl_results:
-            try:
-                data = format_scan_result(result.result_data)
-                if 'error' not in data:
-                    days_until_expiry = data.get('days_until_expiry', 0)
-                    is_valid = data.get('is_valid', False)
-                    
-                    if is_valid:
-                        analysis['valid_certificates'] += 1
-                        if days_until_expiry <= 30:
-                            analysis['expiring_soon'] += 1
-                    else:
-                        analysis['expired_certificates'] += 1
-                    
-                    # Track by domain
-                    domain = result.domain
-                    if domain not in analysis['domains']:
-                        analysis['domains'][domain] = {
-                            'last_scan': result.id,
-                            'status': 'valid' if is_valid else 'expired',
-                            'days_until_expiry': days_until_expiry
-                        }
-            except Exception:
-                continue
+        for expiry in expiries:
+            days_until_expiry = expiry['days_until_expiry']
+            is_valid = expiry['is_valid']
+            
+            if is_valid:
+                analysis['valid_certificates'] += 1
+                if days_until_expiry <= 30:
+                    analysis['expiring_soon'] += 1
+            else:
+                analysis['expired_certificates'] += 1
+            
+            analysis['domains'][expiry['domain']] = {
+                'last_scan': expiry['scan_result_id'],
+                'status': 'valid' if is_valid else 'expired',
+                'days_until_expiry': days_until_expiry
+            }
         
         return analysis
     
@@ -0,0 +1,189 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Dict, Any, List, Optional
+import dns.exception
+import dns.resolver
+
+DEFAULT_POOL_LIFETIME = 5.0
+EWMA_ALPHA = 0.2
+LATENCY_WINDOW = 200
+MIN_SAMPLES_FOR_P95 = 20
+DEFAULT_HEDGE_DELAY = 0.5
+MIN_HEDGE_DELAY = 0.02
+UNHEALTHY_FAILURE_RATE = 0.5
+# An unhealthy upstream is retried after this long (seconds)
+UNHEALTHY_RETRY_AFTER = 30
+
+# Answers that settle a query, even though dnspython raises them
+DEFINITIVE_ERRORS = (dns.resolver.NXDOMAIN, dns.resolver.NoAnswer, dns.resolver.YXDOMAIN)
+
+class Upstream:
+    """One upstream nameserver with its latency and failure statistics"""
+
+    def __init__(self, nameserver: str, lifetime: float):
+        self.nameserver = nameserver
+        self.resolver = dns.resolver.Resolver(configure=False)
+        self.resolver.nameservers = [nameserver]
+        self.resolver.lifetime = lifetime
+        self.ewma_ms = None
+        self.failure_rate = 0.0
+        self.queries = 0
+        self.failures = 0
+        self.hedges_won = 0
+        self.last_failure = 0.0
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+
+    def is_healthy(self) -> bool:
+        """Check whether the upstream should receive queries"""
+        if self.failure_rate < UNHEALTHY_FAILURE_RATE:
+            return True
+        return time.monotonic() - self.last_failure > UNHEALTHY_RETRY_AFTER
+
+    def record(self, seconds: float, failed: bool):
+        """Fold one query outcome into the statistics"""
+        self.queries += 1
+        self.failure_rate += EWMA_ALPHA * ((1.0 if failed else 0.0) - self.failure_rate)
+        if failed:
+            self.failures += 1
+            self.last_failure = time.monotonic()
+            return
+
+        ms = seconds * 1000
+        self.latencies.append(ms)
+        self.ewma_ms = ms if self.ewma_ms is None else self.ewma_ms + EWMA_ALPHA * (ms - self.ewma_ms)
+
+    def p95(self) -> float:
+        """Get the 95th percentile latency in seconds, used as the hedge delay"""
+        if len(self.latencies) < MIN_SAMPLES_FOR_P95:
+            return DEFAULT_HEDGE_DELAY
+        ordered = sorted(self.latencies)
+        return max(MIN_HEDGE_DELAY, ordered[int(len(ordered) * 0.95) - 1] / 1000)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'nameserver': self.nameserver,
+            'healthy': self.is_healthy(),
+            'ewma_ms': round(self.ewma_ms, 2) if self.ewma_ms is not None else None,
+            'p95_ms': round(self.p95() * 1000, 2),
+            'failure_rate': round(self.failure_rate, 4),
+            'queries': self.queries,
+            'failures': self.failures,
+            'hedges_won': self.hedges_won
+        }
+
+class ResolverPool:
+    """
+    Sends each query to the fastest healthy upstream, hedging with a second
+    upstream when the first has not answered within its p95 latency, and failing
+    over to the remaining upstreams in turn while queries fail
+    """
+
+    def __init__(self, nameservers: List[str], lifetime: float = DEFAULT_POOL_LIFETIME, max_workers: int = 64):
+        if not nameservers:
+            raise ValueError('ResolverPool needs at least one upstream nameserver')
+        self.lifetime = lifetime
+        self.upstreams = [Upstream(ns, lifetime) for ns in nameservers]
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        self._lock = threading.Lock()
+        self.hedged_queries = 0
+
+    def _ranked(self) -> List[Upstream]:
+        """Order upstreams healthy-first, then by latency (untried ones first)"""
+        with self._lock:
+            return sorted(self.upstreams, key=lambda u: (
+                not u.is_healthy(),
+                u.ewma_ms if u.ewma_ms is not None else 0
+            ))
+
+    def _query(self, upstream: Upstream, qname, rdtype, lifetime: float):
+        """Query one upstream and record how it went"""
+        start = time.perf_counter()
+        try:
+            answer = upstream.resolver.resolve(qname, rdtype, lifetime=lifetime, search=False)
+        except DEFINITIVE_ERRORS:
+            with self._lock:
+                upstream.record(time.perf_counter() - start, failed=False)
+            raise
+        except Exception:
+            with self._lock:
+                upstream.record(time.perf_counter() - start, failed=True)
+            raise
+
+        with self._lock:
+            upstream.record(time.perf_counter() - start, failed=False)
+        return answer
+
+    def resolve(self, qname, rdtype='A', lifetime: Optional[float] = None) -> dns.resolver.Answer:
+        """
+        Resolve a query through the pool
+        """
+        lifetime = lifetime or self.lifetime
+        deadline = time.monotonic() + lifetime
+        ranked = self._ranked()
+        untried = list(ranked[1:])
+        futures = {}
+
+        def launch(upstream):
+            remaining = max(0.1, deadline - time.monotonic())
+            future = self.executor.submit(self._query, upstream, qname, rdtype, remaining)
+            futures[future] = upstream
+            return future
+
+        primary = ranked[0]
+        launch(primary)
+        done, _ = wait(futures, timeout=primary.p95())
+
+        # Hedge when the primary is slower than usual
+        if not done and untried:
+            with self._lock:
+                self.hedged_queries += 1
+            launch(untried.pop(0))
+
+        error = None
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, timeout=max(0, deadline - time.monotonic()), return_when=FIRST_COMPLETED)
+            if not done:
+                break
+            for future in done:
+                exception = future.exception()
+                if exception is None or isinstance(exception, DEFINITIVE_ERRORS):
+                    if futures[future] is not primary:
+                        with self._lock:
+                            futures[future].hedges_won += 1
+                    return future.result()
+                error = exception
+                # Fail over to the next upstream not tried yet
+                if untried and time.monotonic() < deadline:
+                    pending.add(launch(untried.pop(0)))
+
+        # Every upstream tried failed (or the lifetime ran out)
+        if error is not None:
+            raise error
+        raise dns.exception.Timeout(timeout=lifetime)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get per-upstream statistics"""
+        with self._lock:
+            return {
+                'hedged_queries': self.hedged_queries,
+                'upstreams': [u.to_dict() for u in self.upstreams]
+            }
+
+_pool = None
+
+def configure_resolver_pool(nameservers: Optional[List[str]], lifetime: Optional[float] = None) -> Optional[ResolverPool]:
+    """
+    Build the process-wide resolver pool, or disable it when no upstreams are given
+    """
+    global _pool
+    _pool = ResolverPool(nameservers, lifetime or DEFAULT_POOL_LIFETIME) if nameservers else None
+    return _pool
+
+def get_resolver_pool() -> Optional[ResolverPool]:
+    """
+    Get the configured resolver pool, if any
+    """
+    return _pool
@@ -1,29 +1,41 @@
-from flask import Blueprint, render_template, request, flash, redirect, url_for, jsonify, send_file
+from flask import Blueprint, render_template, request, flash, redirect, url_for, jsonify, send_file, current_app
 from flask_login import login_required, current_user
 from vaultview.db import db
 from vaultview.models import ScanResult, User
-from vaultview.ssl_checker import check_ssl
+from vaultview.ssl_checker import (check_ssl, check_ssl_bulk, check_ssl_all_addresses, check_tls_sweep,
+                                   without_certificate_der)
 from vaultview.dns_checker import check_dns
-from vaultview.blacklist_checker import check_blacklist
+from vaultview.blacklist_checker import check_blacklist, DNSBL_ZONES
 from vaultview.email_checker import check_email
 from vaultview.notifications import send_ssl_alert, send_blacklist_alert, notification_manager
 from vaultview.bulk_processor import bulk_processor, parse_csv_domains, parse_text_domains, export_results_to_csv
+from vaultview.tls_context import tls_context_manager
+from vaultview.dns_cache import get_cache_stats
+from vaultview.zone_health import zone_health
+from vaultview.dnsbl_mirror import dnsbl_mirror
+from vaultview.dnsbl_cache import blacklist_cache
+from vaultview.smtp_cache import smtp_probe_cache
+from vaultview.spf import spf_expander
+from vaultview.cert_store import get_certificate, domains_for_certificate, get_expiring_certificates
+from vaultview.whois_checker import lookup_whois
 from vaultview.utils import format_scan_result, format_timestamp
 import json
-import whois
 from io import BytesIO
 from datetime import datetime
-import socket
 
 main = Blueprint('main', __name__)
 
+# Most domains one /api/scan request may probe at once (SSL_BULK_MAX_DOMAINS overrides it)
+MAX_BULK_SSL_DOMAINS = 100
+
 @main.route('/')
 @login_required
 def index():
     """Main dashboard page"""
     # Get user's recent scan results
     scan_results = ScanResult.query.filter_by(user_id=current_user.id).order_by(ScanResult.id.desc()).limit(10).all()
-    return render_template('index.html', scan_results=scan_results)
+    expiring_certificates = get_expiring_certificates(current_user.id, days=30)
+    return render_template('index.html', scan_results=scan_results, expiring_certificates=expiring_certificates)
 
 @main.route('/about')
 def about():
@@ -49,25 +61,22 @@ def scan_domain():
     
     try:
         if scan_type == 'SSL':
-            result_data = check_ssl(domain)
+            result_data = check_ssl(domain, include_der=True)
             # Check for SSL alerts
             try:
                 ssl_data = json.loads(result_data)
                 send_ssl_alert(domain, ssl_data, current_user.id)
             except:
                 pass
+        elif scan_type == 'SSL_ADDRESSES':
+            result_data = check_ssl_all_addresses(domain)
+        elif scan_type == 'TLS_SWEEP':
+            result_data = check_tls_sweep(domain, current_app.config.get('TLS_SWEEP_PORTS'))
         elif scan_type == 'DNS':
             result_data = check_dns(domain)
         elif scan_type == 'WHOIS':
             try:
-                # Set timeout for WHOIS query
-                original_timeout = socket.getdefaulttimeout()
-                socket.setdefaulttimeout(10)  # 10 second timeout
-                
-                whois_data = whois.whois(domain)
-                
-                # Restore original timeout
-                socket.setdefaulttimeout(original_timeout)
+                whois_data = lookup_whois(domain)
                 
                 # Extract key fields for display with better error handling
                 result_data = json.dumps({
@@ -126,30 +135,31 @@ def api_scan():
     domain = data.get('domain', '').strip()
     scan_type = data.get('type', 'SSL')
     
+    # Several SSL domains in one request are probed concurrently
+    if data.get('domains') and scan_type == 'SSL':
+        return api_scan_ssl_bulk(data['domains'])
+    
     if not domain:
         return jsonify({'error': 'Domain is required'}), 400
     
     try:
         if scan_type == 'SSL':
-            result_data = check_ssl(domain)
+            result_data = check_ssl(domain, include_der=True)
             # Check for SSL alerts
             try:
                 ssl_data = json.loads(result_data)
                 send_ssl_alert(domain, ssl_data, current_user.id)
             except:
                 pass
+        elif scan_type == 'SSL_ADDRESSES':
+            result_data = check_ssl_all_addresses(domain)
+        elif scan_type == 'TLS_SWEEP':
+            result_data = check_tls_sweep(domain, current_app.config.get('TLS_SWEEP_PORTS'))
         elif scan_type == 'DNS':
             result_data = check_dns(domain)
         elif scan_type == 'WHOIS':
             try:
-                # Set timeout for WHOIS query
-                original_timeout = socket.getdefaulttimeout()
-                socket.setdefaulttimeout(10)  # 10 second timeout
-                
-                whois_data = whois.whois(domain)
-                
-                # Restore original timeout
-                socket.setdefaulttimeout(original_timeout)
+                whois_data = lookup_whois(domain)
                 
                 # Extract key fields for display with better error handling
                 result_data = json.dumps({
@@ -195,12 +205,55 @@ def api_scan():
         return jsonify({
             'success': True,
             'message': f'Successfully scanned {domain}',
-            'result': json.loads(result_data)
+            'result': without_certificate_der(json.loads(result_data))
         })
         
     except Exception as e:
         return jsonify({'error': f'Error scanning {domain}: {str(e)}'}), 500
 
+def api_scan_ssl_bulk(domains):
+    """Probe several SSL domains concurrently and save each result"""
+    if not isinstance(domains, list):
+        return jsonify({'error': 'domains must be a list'}), 400
+    
+    max_domains = current_app.config.get('SSL_BULK_MAX_DOMAINS', MAX_BULK_SSL_DOMAINS)
+    if len(domains) > max_domains:
+        return jsonify({'error': f'At most {max_domains} domains can be scanned per request; use a bulk job for more'}), 400
+    
+    domains = list(dict.fromkeys(d.strip() for d in domains if isinstance(d, str) and d.strip()))
+    if not domains:
+        return jsonify({'error': 'Domain is required'}), 400
+    
+    try:
+        ssl_results = check_ssl_bulk(domains, include_der=True)
+        
+        results = {}
+        for domain, result_data in ssl_results.items():
+            ssl_data = json.loads(result_data)
+            try:
+                send_ssl_alert(domain, ssl_data, current_user.id)
+            except:
+                pass
+            
+            db.session.add(ScanResult(
+                user_id=current_user.id,
+                domain=domain,
+                result_type='SSL',
+                result_data=result_data
+            ))
+            results[domain] = without_certificate_der(ssl_data)
+        
+        db.session.commit()
+        
+        return jsonify({
+            'success': True,
+            'message': f'Successfully scanned {len(results)} domains',
+            'results': results
+        })
+        
+    except Exception as e:
+        return jsonify({'error': f'Error scanning domains: {str(e)}'}), 500
+
 @main.route('/api/results')
 @login_required
 def api_results():
@@ -234,6 +287,77 @@ def health_check():
     """Health check endpoint"""
     return jsonify({'status': 'healthy', 'message': 'VaultView is running'})
 
+@main.route('/api/certificates/expiring')
+@login_required
+def expiring_certificates():
+    """Certificates expiring within a window (days, default 30)"""
+    days = request.args.get('days', 30, type=int)
+    limit = request.args.get('limit', None, type=int)
+    
+    certificates = get_expiring_certificates(current_user.id, days=days, limit=limit)
+    return jsonify({
+        'days': days,
+        'count': len(certificates),
+        'certificates': certificates
+    })
+
+@main.route('/api/certificates/<fingerprint>')
+@login_required
+def certificate_details(fingerprint):
+    """Stored certificate and the user's domains serving it"""
+    certificate = get_certificate(fingerprint.lower())
+    if not certificate:
+        return jsonify({'error': 'Certificate not found'}), 404
+    
+    certificate['domains'] = domains_for_certificate(fingerprint.lower(), current_user.id)
+    return jsonify(certificate)
+
+@main.route('/api/dns/cache')
+@login_required
+def dns_cache_stats():
+    """Shared DNS resolver cache hit/miss counters"""
+    return jsonify(get_cache_stats())
+
+@main.route('/api/tls/stats')
+@login_required
+def tls_stats():
+    """Shared TLS context, session cache and per-phase probe timings"""
+    return jsonify(tls_context_manager.get_stats())
+
+@main.route('/api/email/smtp-cache')
+@login_required
+def smtp_cache_stats():
+    """Shared SMTP probe cache hit/miss counters"""
+    return jsonify(smtp_probe_cache.get_stats())
+
+@main.route('/api/email/spf-cache')
+@login_required
+def spf_cache_stats():
+    """Shared SPF include expansion cache hit/miss counters"""
+    return jsonify(spf_expander.get_stats())
+
+@main.route('/api/blacklist/health')
+@login_required
+def blacklist_zone_health():
+    """Circuit breaker state of every DNSBL zone"""
+    return jsonify({
+        bl_key: {
+            'name': bl_info['name'],
+            'mirrored': dnsbl_mirror.has_zone(bl_info['zone']),
+            **zone_health.get_status(bl_info['zone'])
+        }
+        for bl_key, bl_info in DNSBL_ZONES.items()
+    })
+
+@main.route('/api/blacklist/cache')
+@login_required
+def blacklist_cache_stats():
+    """Per-(IP, zone) blacklist cache and mirror counters"""
+    return jsonify({
+        'cache': blacklist_cache.get_stats(),
+        'mirror': dnsbl_mirror.get_stats()
+    })
+
 @main.route('/bulk')
 @login_required
 def bulk_page():
@@ -273,17 +397,19 @@ def bulk_scan():
     
     results = []
     
+    # SSL handshakes for the whole list run concurrently
+    ssl_results = check_ssl_bulk(domains, include_der=True) if scan_type == 'SSL' else {}
+    
     # Process each domain
     for domain in domains:
         try:
             if scan_type == 'SSL':
-                from vaultview.ssl_checker import check_ssl
-                result = check_ssl(domain)
+                result = ssl_results[domain]
                 results.append({
                     'domain': domain,
                     'status': 'success',
                     'scan_type': 'SSL',
-                    'data': json.loads(result) if result else {'error': 'No SSL data returned'},
+                    'data': without_certificate_der(json.loads(result)) if result else {'error': 'No SSL data returned'},
                     'message': f'SSL check completed'
                 })
                 
@@ -317,16 +443,8 @@ def bulk_scan():
                 db.session.add(scan_result)
                 
             elif scan_type == 'WHOIS':
-                import whois
-                import socket
-                
-                # Set timeout
-                original_timeout = socket.getdefaulttimeout()
-                socket.setdefaulttimeout(10)
-                
                 try:
-                    whois_data = whois.whois(domain)
-                    socket.setdefaulttimeout(original_timeout)
+                    whois_data = lookup_whois(domain)
                     
                     # Format WHOIS data for display
                     formatted_whois = {
@@ -359,7 +477,6 @@ def bulk_scan():
                     db.session.add(scan_result)
                     
                 except Exception as e:
-                    socket.setdefaulttimeout(original_timeout)
                     results.append({
                         'domain': domain,
                         'status': 'error',
@@ -1,25 +1,40 @@
 import schedule
 import time
 import threading
-from datetime import datetime
+from datetime import datetime, timedelta
 from flask import current_app
 from vaultview.db import db
 from vaultview.models import ScanResult, User
-from vaultview.ssl_checker import check_ssl
+from vaultview.ssl_checker import check_ssl, check_ssl_bulk
 from vaultview.dns_checker import check_dns
+from vaultview.cert_store import get_all_expiring_certificates
+from vaultview.notifications import send_ssl_alert
 from vaultview.utils import get_ist_now, format_timestamp_log
 
+# Days before expiry at which a certificate is alerted on; 0 is the moment it expires
+EXPIRY_ALERT_THRESHOLDS = (30, 14, 7, 1, 0)
+EXPIRY_CHECK_INTERVAL_HOURS = 24
+
+def crossed_expiry_threshold(not_after, since, now, days=30):
+    """Check whether a certificate reached one of the alert thresholds between since and now"""
+    return any(since < not_after - timedelta(days=threshold) <= now
+               for threshold in EXPIRY_ALERT_THRESHOLDS if threshold <= days)
+
 class DomainScheduler:
     def __init__(self):
         self.running = False
         self.thread = None
         self.app = None
+        self.last_expiry_check = None
     
     def start(self, app=None):
         """Start the scheduler in a separate thread"""
         if not self.running:
             self.running = True
             self.app = app
+            # Registered under a fixed tag so a restarted scheduler does not alert twice
+            schedule.clear('certificate-expiry')
+            schedule.every(EXPIRY_CHECK_INTERVAL_HOURS).hours.do(self._alert_expiring_certificates).tag('certificate-expiry')
             self.thread = threading.Thread(target=self._run_scheduler)
             self.thread.daemon = True
             self.thread.start()
@@ -38,6 +53,33 @@ class DomainScheduler:
             schedule.run_pending()
             time.sleep(60)  # Check every minute
     
+    def _alert_expiring_certificates(self, days=30):
+        """
+        Send alerts for certificates that reached an alert threshold since the previous check,
+        read from the expiry table, so each certificate is alerted once per threshold
+        """
+        try:
+            app = self.app or current_app._get_current_object()
+            with app.app_context():
+                now = datetime.now()
+                # The first check after a start covers one interval, as if the previous one had run
+                since = self.last_expiry_check or now - timedelta(hours=EXPIRY_CHECK_INTERVAL_HOURS)
+                expiring = get_all_expiring_certificates(days, expired_since=since)
+                alerted = 0
+                for certificate in expiring:
+                    if not crossed_expiry_threshold(datetime.fromisoformat(certificate['not_after']), since, now, days):
+                        continue
+                    send_ssl_alert(certificate['domain'], {
+                        'days_until_expiry': certificate['days_until_expiry'],
+                        'valid_until': certificate['not_after'],
+                        'issuer': certificate['issuer']
+                    }, certificate['user_id'])
+                    alerted += 1
+                self.last_expiry_check = now
+                print(f"✓ Certificate expiry check alerted on {alerted} of {len(expiring)} certificates at {format_timestamp_log(get_ist_now())}")
+        except Exception as e:
+            print(f"✗ Error in certificate expiry check at {format_timestamp_log(get_ist_now())}: {str(e)}")
+    
     def add_domain_monitoring(self, domain, scan_type, user_id, interval_hours=24):
         """Add a domain to be monitored at regular intervals"""
         if scan_type == 'SSL':
@@ -49,13 +91,38 @@ class DomainScheduler:
                 self._perform_dns_scan, domain, user_id
             )
     
+    def add_ssl_group_monitoring(self, domains, user_id, interval_hours=24):
+        """Add a group of domains whose SSL certificates are probed together"""
+        schedule.every(interval_hours).hours.do(
+            self._perform_ssl_group_scan, list(domains), user_id
+        )
+    
+    def _perform_ssl_group_scan(self, domains, user_id):
+        """Perform concurrent SSL scans for a group of domains and save results"""
+        try:
+            app = self.app or current_app._get_current_object()
+            with app.app_context():
+                ssl_results = check_ssl_bulk(domains, include_der=True)
+                for domain, result_data in ssl_results.items():
+                    scan_result = ScanResult(
+                        domain=domain,
+                        result_type='SSL',
+                        result_data=result_data,
+                        user_id=user_id
+                    )
+                    db.session.add(scan_result)
+                db.session.commit()
+                print(f"✓ Scheduled SSL scan completed for {len(domains)} domains at {format_timestamp_log(get_ist_now())}")
+        except Exception as e:
+            print(f"✗ Error in scheduled SSL group scan at {format_timestamp_log(get_ist_now())}: {str(e)}")
+    
     def _perform_ssl_scan(self, domain, user_id):
         """Perform SSL scan and save results"""
         try:
             # Use Flask app context for database operations
             if self.app:
                 with self.app.app_context():
-                    result_data = check_ssl(domain)
+                    result_data = check_ssl(domain, include_der=True)
                     scan_result = ScanResult(
                         domain=domain,
                         result_type='SSL',
@@ -68,7 +135,7 @@ class DomainScheduler:
             else:
                 # Fallback to current_app if available
                 with current_app.app_context():
-                    result_data = check_ssl(domain)
+                    result_data = check_ssl(domain, include_der=True)
                     scan_result = ScanResult(
                         domain=domain,
                         result_type='SSL',
@@ -0,0 +1,96 @@
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Dict, Any, Callable, Optional, Tuple
+
+DEFAULT_SMTP_PROBE_TTL = 3600
+MAX_SMTP_PROBE_ENTRIES = 10000
+
+def probe_failed(result: Dict[str, Any]) -> bool:
+    """
+    Check whether a probe result (or any test inside it) failed to connect
+    """
+    if result.get('status') == 'Failed':
+        return True
+    return any(isinstance(value, dict) and value.get('status') == 'Failed' for value in result.values())
+
+class SMTPProbeCache:
+    """
+    Caches SMTP test results per MX host and IP, so domains hosted by the same mail
+    provider share one probe; concurrent checks wait on the probe already in flight.
+    Failed probes (timeouts, refused connections) are not cached, so the next check retries.
+    """
+
+    def __init__(self, ttl: float = DEFAULT_SMTP_PROBE_TTL, max_entries: int = MAX_SMTP_PROBE_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.joined = 0
+
+    def configure(self, ttl: Optional[float] = None):
+        """Set the cache TTL in seconds; 0 disables caching"""
+        if ttl is not None:
+            self.ttl = ttl
+
+    def lookup(self, key: Tuple, probe: Callable[[], Dict[str, Any]]) -> Tuple[Dict[str, Any], bool]:
+        """
+        Get (result, from_cache) for key, running probe() only if nothing is cached or in flight
+        """
+        owner = False
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1], True
+
+            future = self._inflight.get(key)
+            if future is not None:
+                self.joined += 1
+            else:
+                self.misses += 1
+                future = self._inflight[key] = Future()
+                owner = True
+
+        if not owner:
+            return future.result(), True
+
+        try:
+            result = probe()
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            if self.ttl > 0 and not probe_failed(result):
+                with self._lock:
+                    self._entries[key] = (time.monotonic() + self.ttl, result)
+                    self._entries.move_to_end(key)
+                    while len(self._entries) > self.max_entries:
+                        self._entries.popitem(last=False)
+            return result, False
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache size and hit counters"""
+        with self._lock:
+            lookups = self.hits + self.misses + self.joined
+            return {
+                'ttl': self.ttl,
+                'entries': len(self._entries),
+                'in_flight': len(self._inflight),
+                'hits': self.hits,
+                'misses': self.misses,
+                'joined_in_flight': self.joined,
+                'hit_rate': round((self.hits + self.joined) / lookups, 4) if lookups else 0
+            }
+
+# Global SMTP probe cache instance
+smtp_probe_cache = SMTPProbeCache()
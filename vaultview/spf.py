@@ -0,0 +1,235 @@
+import ipaddress
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Set
+import dns.resolver
+from vaultview.dns_cache import resolve
+
+# RFC 7208 4.6.4: at most 10 mechanisms/modifiers that cause DNS lookups
+MAX_SPF_LOOKUPS = 10
+# A/AAAA lookups allowed per 'mx' mechanism
+MAX_MX_HOSTS = 10
+MAX_INCLUDE_DEPTH = 10
+# Expanded records are reused for their DNS TTL, within these bounds (seconds)
+MIN_SPF_CACHE_TTL = 60
+MAX_SPF_CACHE_TTL = 3600
+MAX_SPF_CACHE_ENTRIES = 10000
+
+LOOKUP_MECHANISMS = ('include', 'a', 'mx', 'ptr', 'exists')
+
+def _ttl(answer) -> float:
+    return answer.rrset.ttl if answer is not None and answer.rrset is not None else MAX_SPF_CACHE_TTL
+
+def fetch_spf_record(domain: str, engine=None) -> Optional[Dict[str, Any]]:
+    """
+    Fetch the SPF TXT record of a domain, joining multi-string records
+    """
+    answers = resolve(domain, 'TXT', engine=engine)
+    for rdata in answers:
+        text = b''.join(rdata.strings).decode('utf-8', errors='ignore')
+        if text.lower().startswith('v=spf1'):
+            return {'record': text, 'ttl': _ttl(answers)}
+    return None
+
+class SPFExpansion:
+    """The flattened result of expanding one domain's SPF record"""
+
+    def __init__(self, domain: str):
+        self.domain = domain
+        self.record = None
+        self.lookups = 0
+        self.ip4: Set[ipaddress.IPv4Network] = set()
+        self.ip6: Set[ipaddress.IPv6Network] = set()
+        self.includes: List[str] = []
+        self.errors: List[str] = []
+        self.ttl = MAX_SPF_CACHE_TTL
+
+    def merge(self, other: 'SPFExpansion'):
+        """Fold an included record into this one"""
+        self.lookups += other.lookups
+        self.ip4 |= other.ip4
+        self.ip6 |= other.ip6
+        self.errors.extend(other.errors)
+        self.ttl = min(self.ttl, other.ttl)
+
+    def add_address(self, address: str, cidr4: Optional[int] = None, cidr6: Optional[int] = None):
+        network = ipaddress.ip_network(address, strict=False)
+        if network.version == 4:
+            if cidr4 is not None:
+                network = network.supernet(new_prefix=cidr4) if cidr4 < network.prefixlen else network
+            self.ip4.add(network)
+        else:
+            if cidr6 is not None:
+                network = network.supernet(new_prefix=cidr6) if cidr6 < network.prefixlen else network
+            self.ip6.add(network)
+
+class SPFExpander:
+    """
+    Expands SPF records recursively, memoizing each expanded domain for its TTL so common
+    provider includes (e.g. _spf.google.com) are resolved once across many domains
+    """
+
+    def __init__(self, max_entries: int = MAX_SPF_CACHE_ENTRIES):
+        self.max_entries = max_entries
+        self._memo = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def expand(self, domain: str, _stack: tuple = (), engine=None) -> SPFExpansion:
+        """
+        Expand a domain's SPF record, including everything it includes or redirects to
+        """
+        domain = domain.lower().rstrip('.')
+        with self._lock:
+            entry = self._memo.get(domain)
+            if entry is not None and entry[0] > time.monotonic():
+                self._memo.move_to_end(domain)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        expansion = self._expand(domain, _stack + (domain,), engine)
+
+        # Results cut short by loops or depth depend on the caller, so they are not shared
+        if not any(e.startswith(('Include loop', 'Too many nested')) for e in expansion.errors):
+            ttl = max(MIN_SPF_CACHE_TTL, min(expansion.ttl, MAX_SPF_CACHE_TTL))
+            with self._lock:
+                self._memo[domain] = (time.monotonic() + ttl, expansion)
+                self._memo.move_to_end(domain)
+                while len(self._memo) > self.max_entries:
+                    self._memo.popitem(last=False)
+        return expansion
+
+    def _expand(self, domain: str, stack: tuple, engine=None) -> SPFExpansion:
+        expansion = SPFExpansion(domain)
+        try:
+            found = fetch_spf_record(domain, engine)
+        except (dns.resolver.NXDOMAIN, dns.resolver.NoAnswer):
+            found = None
+        except Exception as e:
+            expansion.errors.append(f'{domain}: {str(e)}')
+            return expansion
+        if found is None:
+            expansion.errors.append(f'{domain}: no SPF record')
+            return expansion
+
+        expansion.record = found['record']
+        expansion.ttl = found['ttl']
+        redirect = None
+        has_all = False
+
+        for term in found['record'].split()[1:]:
+            qualifier = term[0] if term[0] in '+-~?' else '+'
+            term = term.lstrip('+-~?')
+            name = re.split('[:/=]', term, 1)[0].lower()
+            value = term.split(':', 1)[1] if ':' in term else ''
+
+            if term.lower().startswith('redirect='):
+                redirect = term.split('=', 1)[1]
+                continue
+            if name == 'all':
+                has_all = True
+                continue
+            if name in LOOKUP_MECHANISMS:
+                expansion.lookups += 1
+            if '%{' in term:
+                expansion.errors.append(f'{domain}: macro in {term} not expanded')
+                continue
+
+            try:
+                if name in ('ip4', 'ip6'):
+                    if qualifier == '+':
+                        expansion.add_address(value)
+                elif name == 'include':
+                    self._include(expansion, value, stack, engine)
+                elif name in ('a', 'mx') and qualifier == '+':
+                    target, cidr4, cidr6 = self._parse_target(term, domain)
+                    self._expand_hosts(expansion, name, target, cidr4, cidr6, engine)
+            except ValueError as e:
+                expansion.errors.append(f'{domain}: invalid term {term}: {str(e)}')
+
+        # RFC 7208 6.1: redirect only applies when the record has no 'all'
+        if redirect and not has_all:
+            expansion.lookups += 1
+            self._include(expansion, redirect, stack, engine)
+
+        return expansion
+
+    def _include(self, expansion: SPFExpansion, target: str, stack: tuple, engine=None):
+        target = target.lower().rstrip('.')
+        if target in stack:
+            expansion.errors.append(f'Include loop: {" -> ".join(stack + (target,))}')
+            return
+        if len(stack) > MAX_INCLUDE_DEPTH:
+            expansion.errors.append(f'Too many nested includes below {expansion.domain}')
+            return
+        expansion.includes.append(target)
+        expansion.merge(self.expand(target, stack, engine))
+
+    @staticmethod
+    def _parse_target(term: str, domain: str):
+        """Split 'a:host/24//64' into (host, 24, 64)"""
+        spec, _, cidr = term.partition('/')
+        cidr4, _, cidr6 = cidr.partition('/') if cidr else ('', '', '')
+        cidr6 = cidr6.lstrip('/')
+        target = spec.split(':', 1)[1] if ':' in spec else domain
+        return target, int(cidr4) if cidr4 else None, int(cidr6) if cidr6 else None
+
+    def _expand_hosts(self, expansion: SPFExpansion, mechanism: str, target: str,
+                      cidr4: Optional[int], cidr6: Optional[int], engine=None):
+        hosts = [target]
+        if mechanism == 'mx':
+            try:
+                answers = resolve(target, 'MX', engine=engine)
+                expansion.ttl = min(expansion.ttl, _ttl(answers))
+                hosts = [str(r.exchange).rstrip('.') for r in answers][:MAX_MX_HOSTS]
+            except (dns.resolver.NXDOMAIN, dns.resolver.NoAnswer):
+                return
+            except Exception as e:
+                expansion.errors.append(f'{target}: {str(e)}')
+                return
+
+        for host in hosts:
+            for rdtype in ('A', 'AAAA'):
+                try:
+                    answers = resolve(host, rdtype, engine=engine)
+                except (dns.resolver.NXDOMAIN, dns.resolver.NoAnswer):
+                    continue
+                except Exception as e:
+                    expansion.errors.append(f'{host}: {str(e)}')
+                    continue
+                expansion.ttl = min(expansion.ttl, _ttl(answers))
+                for rdata in answers:
+                    expansion.add_address(str(rdata), cidr4, cidr6)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get memo cache size and hit counters"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._memo),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0
+            }
+
+# Global SPF expander instance
+spf_expander = SPFExpander()
+
+def evaluate_spf(domain: str, engine=None) -> Dict[str, Any]:
+    """
+    Expand a domain's SPF record and report its DNS lookup count and flattened IP set
+    """
+    expansion = spf_expander.expand(domain, engine=engine)
+    return {
+        'lookup_count': expansion.lookups,
+        'lookup_limit': MAX_SPF_LOOKUPS,
+        'exceeds_lookup_limit': expansion.lookups > MAX_SPF_LOOKUPS,
+        'includes': expansion.includes,
+        'flattened_ip4': [str(n) for n in ipaddress.collapse_addresses(expansion.ip4)],
+        'flattened_ip6': [str(n) for n in ipaddress.collapse_addresses(expansion.ip6)],
+        'expansion_errors': expansion.errors
+    }
@@ -1,52 +1,431 @@
 import ssl
 import socket
+import asyncio
+import threading
+import time
+import hashlib
+import base64
+import functools
+from concurrent.futures import Future
 from datetime import datetime
 import json
+from typing import Dict, Any, List, Optional, Tuple, Callable
+from vaultview.tls_context import tls_context_manager
 
-def check_ssl(domain):
+SSL_PORT = 443
+SSL_TIMEOUT = 10
+DEFAULT_SSL_CONCURRENCY = 200
+DEFAULT_TLS_SWEEP_PORTS = (443, 8443, 465, 993, 995, 587)
+STARTTLS_PORTS = (25, 587)
+
+def check_ssl(domain, include_der=False):
+    """
+    Check SSL certificate information for a given domain; callers saving the result
+    pass include_der so the certificate store receives the DER
+    """
+    try:
+        with tls_context_manager.connect(domain, SSL_PORT, timeout=SSL_TIMEOUT) as ssock:
+            cert = ssock.getpeercert()
+            der = ssock.getpeercert(binary_form=True)
+            return json.dumps(build_ssl_result(domain, cert, der, include_der), indent=2)
+
+    except Exception as e:
+        return ssl_error_result(domain, e)
+
+def build_ssl_result(domain: str, cert: Dict[str, Any], der: Optional[bytes] = None,
+                     include_der: bool = False) -> Dict[str, Any]:
+    """
+    Build the SSL result fields from a peer certificate; with include_der the
+    base64 DER travels in the result so the certificate store can keep it
+    """
+    # Extract certificate information
+    subject = dict(x[0] for x in cert['subject'])
+    issuer = dict(x[0] for x in cert['issuer'])
+
+    # Parse dates
+    not_before = datetime.strptime(cert['notBefore'], '%b %d %H:%M:%S %Y %Z')
+    not_after = datetime.strptime(cert['notAfter'], '%b %d %H:%M:%S %Y %Z')
+
+    # Check if certificate is valid
+    now = datetime.now()
+    is_valid = not_before <= now <= not_after
+
+    # Calculate days until expiration
+    days_until_expiry = (not_after - now).days
+
+    result = {
+        'domain': domain,
+        'subject': subject.get('commonName', 'Unknown'),
+        'issuer': issuer.get('commonName', 'Unknown'),
+        'valid_from': not_before.isoformat(),
+        'valid_until': not_after.isoformat(),
+        'is_valid': is_valid,
+        'days_until_expiry': days_until_expiry,
+        'serial_number': cert.get('serialNumber', 'Unknown'),
+        'version': cert.get('version', 'Unknown')
+    }
+
+    if der:
+        result['fingerprint_sha256'] = hashlib.sha256(der).hexdigest()
+        if include_der:
+            result['certificate_der'] = base64.b64encode(der).decode('ascii')
+
+    return result
+
+def without_certificate_der(data: Any) -> Any:
+    """
+    Drop the DER from an SSL result before it is returned to a client
+    """
+    if isinstance(data, dict) and 'certificate_der' in data:
+        return {key: value for key, value in data.items() if key != 'certificate_der'}
+    return data
+
+def ssl_error(domain: str, error: Exception) -> Dict[str, str]:
+    """
+    Convert a probe exception into an SSL error dict
+    """
+    if isinstance(error, socket.gaierror):
+        return {'error': f'Could not resolve domain: {domain}'}
+    if isinstance(error, (socket.timeout, asyncio.TimeoutError)):
+        return {'error': f'Connection timeout for: {domain}'}
+    if isinstance(error, ssl.SSLError):
+        return {'error': f'SSL error for {domain}: {str(error)}'}
+    return {'error': f'Unexpected error for {domain}: {str(error)}'}
+
+def ssl_error_result(domain: str, error: Exception) -> str:
+    """
+    Convert a probe exception into the SSL error JSON
+    """
+    return json.dumps(ssl_error(domain, error))
+
+async def probe_ssl(domain: str, port: int = SSL_PORT, timeout: float = SSL_TIMEOUT,
+                    include_der: bool = False) -> str:
     """
-    Check SSL certificate information for a given domain
+    Check SSL certificate information for a domain without blocking the event loop
     """
     try:
-        context = ssl.create_default_context()
-        with socket.create_connection((domain, 443), timeout=10) as sock:
-            with context.wrap_socket(sock, server_hostname=domain) as ssock:
-                cert = ssock.getpeercert()
-                
-                # Extract certificate information
-                subject = dict(x[0] for x in cert['subject'])
-                issuer = dict(x[0] for x in cert['issuer'])
-                
-                # Parse dates
-                not_before = datetime.strptime(cert['notBefore'], '%b %d %H:%M:%S %Y %Z')
-                not_after = datetime.strptime(cert['notAfter'], '%b %d %H:%M:%S %Y %Z')
-                
-                # Check if certificate is valid
-                now = datetime.now()
-                is_valid = not_before <= now <= not_after
-                
-                # Calculate days until expiration
-                days_until_expiry = (not_after - now).days
-                
+        cert, der = await asyncio.wait_for(_fetch_peercert(domain, port), timeout)
+        return json.dumps(build_ssl_result(domain, cert, der, include_der), indent=2)
+
+    except Exception as e:
+        return ssl_error_result(domain, e)
+
+async def _fetch_peercert(domain: str, port: int, address: Optional[str] = None,
+                          starttls: bool = False) -> Tuple[Dict[str, Any], bytes]:
+    """
+    Connect, run the TLS handshake with the shared context and return the
+    peer certificate in parsed and DER form
+    """
+    loop = asyncio.get_running_loop()
+    context = tls_context_manager.get_context()
+
+    start = time.perf_counter()
+    reader, writer = await asyncio.open_connection(address or domain, port)
+    tls_context_manager.record_phase('connect', time.perf_counter() - start)
+
+    try:
+        if starttls:
+            await _smtp_starttls(reader, writer)
+
+        start = time.perf_counter()
+        transport = await loop.start_tls(writer.transport, writer.transport.get_protocol(),
+                                         context, server_hostname=domain)
+        tls_context_manager.record_phase('handshake', time.perf_counter() - start)
+        try:
+            ssl_object = transport.get_extra_info('ssl_object')
+            return ssl_object.getpeercert(), ssl_object.getpeercert(binary_form=True)
+        finally:
+            transport.close()
+    finally:
+        writer.close()
+
+async def _read_smtp_reply(reader: asyncio.StreamReader) -> Tuple[int, str]:
+    """Read a (possibly multi-line) SMTP reply"""
+    lines = []
+    while True:
+        line = await reader.readline()
+        if not line:
+            raise ConnectionError('SMTP connection closed')
+        text = line.decode('utf-8', errors='ignore').rstrip()
+        lines.append(text[4:])
+        if len(text) < 4 or text[3] != '-':
+            return int(text[:3]), '\n'.join(lines)
+
+async def _smtp_starttls(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    """Walk an SMTP session up to the point where the TLS handshake can start"""
+    code, banner = await _read_smtp_reply(reader)
+    if code != 220:
+        raise ConnectionError(f'SMTP banner rejected with {code}')
+
+    writer.write(b'EHLO vaultview.local\r\n')
+    await writer.drain()
+    code, ehlo = await _read_smtp_reply(reader)
+    if code != 250 or 'STARTTLS' not in ehlo.upper():
+        raise ConnectionError('STARTTLS not supported')
+
+    writer.write(b'STARTTLS\r\n')
+    await writer.drain()
+    code, reply = await _read_smtp_reply(reader)
+    if code != 220:
+        raise ConnectionError(f'STARTTLS rejected with {code}')
+
+async def _probe_address(domain: str, address: str, port: int) -> Dict[str, Any]:
+    """Probe one address of a domain and return its certificate details"""
+    try:
+        cert, der = await _fetch_peercert(domain, port, address)
+        return build_ssl_result(domain, cert, der)
+    except Exception as e:
+        return ssl_error(address, e)
+
+async def probe_ssl_addresses(domain: str, port: int = SSL_PORT, timeout: float = SSL_TIMEOUT,
+                              limiter: Optional[Callable] = None) -> str:
+    """
+    Check the SSL certificate served by every A/AAAA address of a domain
+    """
+    try:
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+
+        infos = await asyncio.wait_for(loop.getaddrinfo(domain, port, type=socket.SOCK_STREAM), timeout)
+        addresses = list(dict.fromkeys(info[4][0] for info in infos))
+
+        # Handshake with every address at once under one shared deadline
+        tasks = {}
+        for address in addresses:
+            factory = functools.partial(_probe_address, domain, address, port)
+            tasks[address] = asyncio.ensure_future(limiter(factory) if limiter else factory())
+
+        done, pending = await asyncio.wait(tasks.values(), timeout=max(0, deadline - loop.time()))
+        for task in pending:
+            task.cancel()
+
+        results = {}
+        for address, task in tasks.items():
+            results[address] = task.result() if task in done else {'error': f'Connection timeout for: {address}'}
+
+        return json.dumps(summarize_address_results(domain, port, results), indent=2)
+
+    except Exception as e:
+        return ssl_error_result(domain, e)
+
+def summarize_address_results(domain: str, port: int, results: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Build the per-address result with a certificate consistency verdict
+    """
+    ok = {address: r for address, r in results.items() if 'error' not in r}
+    fingerprints = sorted(set(r['fingerprint_sha256'] for r in ok.values()))
+
+    if not ok:
+        verdict = 'Unreachable'
+    elif len(fingerprints) > 1:
+        verdict = 'Inconsistent'
+    elif len(ok) < len(results):
+        verdict = 'Partial'
+    else:
+        verdict = 'Consistent'
+
+    return {
+        'domain': domain,
+        'port': port,
+        'address_count': len(results),
+        'addresses': results,
+        'fingerprints': fingerprints,
+        'consistent': verdict == 'Consistent',
+        'verdict': verdict,
+        'min_days_until_expiry': min((r['days_until_expiry'] for r in ok.values()), default=None),
+        'all_valid': bool(ok) and all(r['is_valid'] for r in ok.values())
+    }
+
+async def _probe_port(domain: str, address: str, port: int) -> Dict[str, Any]:
+    """Probe one port of a domain, using STARTTLS where the port requires it"""
+    starttls = port in STARTTLS_PORTS
+    protocol = 'STARTTLS' if starttls else 'TLS'
+    try:
+        cert, der = await _fetch_peercert(domain, port, address, starttls=starttls)
+        result = build_ssl_result(domain, cert, der)
+    except Exception as e:
+        result = ssl_error(f'{domain}:{port}', e)
+    result['protocol'] = protocol
+    return result
+
+async def probe_tls_sweep(domain: str, ports: Optional[List[int]] = None, timeout: float = SSL_TIMEOUT,
+                          limiter: Optional[Callable] = None) -> str:
+    """
+    Check the certificates on several ports of every address of a domain in one pass
+    """
+    ports = list(ports or DEFAULT_TLS_SWEEP_PORTS)
+    try:
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+
+        # One resolution shared by every port
+        infos = await asyncio.wait_for(loop.getaddrinfo(domain, None, type=socket.SOCK_STREAM), timeout)
+        addresses = list(dict.fromkeys(info[4][0] for info in infos))
+
+        tasks = {}
+        for port in ports:
+            for address in addresses:
+                factory = functools.partial(_probe_port, domain, address, port)
+                tasks[(port, address)] = asyncio.ensure_future(limiter(factory) if limiter else factory())
+
+        done, pending = await asyncio.wait(tasks.values(), timeout=max(0, deadline - loop.time()))
+        for task in pending:
+            task.cancel()
+
+        results = {}
+        for (port, address), task in tasks.items():
+            if task in done:
+                result = task.result()
+            else:
                 result = {
-                    'domain': domain,
-                    'subject': subject.get('commonName', 'Unknown'),
-                    'issuer': issuer.get('commonName', 'Unknown'),
-                    'valid_from': not_before.isoformat(),
-                    'valid_until': not_after.isoformat(),
-                    'is_valid': is_valid,
-                    'days_until_expiry': days_until_expiry,
-                    'serial_number': cert.get('serialNumber', 'Unknown'),
-                    'version': cert.get('version', 'Unknown')
+                    'error': f'Connection timeout for: {address}:{port}',
+                    'protocol': 'STARTTLS' if port in STARTTLS_PORTS else 'TLS'
                 }
-                
-                return json.dumps(result, indent=2)
-                
-    except socket.gaierror:
-        return json.dumps({'error': f'Could not resolve domain: {domain}'})
-    except socket.timeout:
-        return json.dumps({'error': f'Connection timeout for: {domain}'})
-    except ssl.SSLError as e:
-        return json.dumps({'error': f'SSL error for {domain}: {str(e)}'})
+            results.setdefault(str(port), {})[address] = result
+
+        return json.dumps(summarize_sweep_results(domain, addresses, results), indent=2)
+
     except Exception as e:
-        return json.dumps({'error': f'Unexpected error for {domain}: {str(e)}'}) 
\ No newline at end of file
+        return ssl_error_result(domain, e)
+
+def summarize_sweep_results(domain: str, addresses: List[str], results: Dict[str, Dict[str, Dict[str, Any]]]) -> Dict[str, Any]:
+    """
+    Build the combined multi-port sweep result from {port: {address: result}}
+    """
+    ports = {}
+    all_ok = []
+    inconsistent_ports = []
+    for port, by_address in results.items():
+        ok = [r for r in by_address.values() if 'error' not in r]
+        all_ok.extend(ok)
+        fingerprints = set(r.get('fingerprint_sha256') for r in ok)
+
+        # Each port keeps the fields of its first working address, plus every address's result
+        port_result = dict(ok[0] if ok else next(iter(by_address.values())))
+        port_result['addresses'] = by_address
+        port_result['consistent'] = len(fingerprints) <= 1 and len(ok) == len(by_address)
+        if ok and not port_result['consistent']:
+            inconsistent_ports.append(port)
+        ports[port] = port_result
+
+    return {
+        'domain': domain,
+        'address': addresses[0] if addresses else None,
+        'addresses': addresses,
+        'scan_time': datetime.now().isoformat(),
+        'ports': ports,
+        'summary': {
+            'ports_checked': len(ports),
+            'addresses_checked': len(addresses),
+            'tls_ports': len([r for r in ports.values() if 'error' not in r]),
+            'failed_ports': len([r for r in ports.values() if 'error' in r]),
+            'inconsistent_ports': inconsistent_ports,
+            'distinct_certificates': len(set(r.get('fingerprint_sha256') for r in all_ok)),
+            'min_days_until_expiry': min((r['days_until_expiry'] for r in all_ok), default=None),
+            'all_valid': bool(all_ok) and all(r['is_valid'] for r in all_ok)
+        }
+    }
+
+class SSLProbeEngine:
+    """Runs TLS certificate probes concurrently on a background event loop"""
+
+    def __init__(self, concurrency: int = DEFAULT_SSL_CONCURRENCY):
+        self.concurrency = concurrency
+        self.loop = None
+        self.thread = None
+        # Probes holding a slot, and the condition waiting probes wait on; both live on the loop
+        self._in_flight = 0
+        self._slot_freed = None
+        self._lock = threading.Lock()
+
+    def set_concurrency(self, concurrency: int):
+        """
+        Set the maximum number of handshakes in flight. Probes already running keep their
+        slots, so after a decrease new ones start only once the count drops below the limit.
+        """
+        self.concurrency = max(1, int(concurrency))
+        if self.loop is not None:
+            # Let waiting probes re-check the new limit
+            asyncio.run_coroutine_threadsafe(self._notify_all(), self.loop)
+
+    def _ensure_started(self):
+        """Start the event loop thread on first use"""
+        with self._lock:
+            if self.loop is None:
+                self.loop = asyncio.new_event_loop()
+                self.thread = threading.Thread(target=self._run_loop, daemon=True)
+                self.thread.start()
+
+    def _run_loop(self):
+        """Run the event loop forever"""
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def _condition(self) -> asyncio.Condition:
+        if self._slot_freed is None:
+            self._slot_freed = asyncio.Condition()
+        return self._slot_freed
+
+    async def _notify_all(self):
+        condition = self._condition()
+        async with condition:
+            condition.notify_all()
+
+    async def _limited(self, factory: Callable):
+        """Run a coroutine factory once a concurrency slot is free"""
+        condition = self._condition()
+        async with condition:
+            await condition.wait_for(lambda: self._in_flight < self.concurrency)
+            self._in_flight += 1
+        try:
+            return await factory()
+        finally:
+            async with condition:
+                self._in_flight -= 1
+                condition.notify()
+
+    def submit(self, domain: str, port: int = SSL_PORT, timeout: float = SSL_TIMEOUT,
+               include_der: bool = False) -> Future:
+        """Schedule a probe and return a future resolving to the SSL JSON"""
+        self._ensure_started()
+        factory = functools.partial(probe_ssl, domain, port, timeout, include_der)
+        return asyncio.run_coroutine_threadsafe(self._limited(factory), self.loop)
+
+    def submit_addresses(self, domain: str, port: int = SSL_PORT, timeout: float = SSL_TIMEOUT) -> Future:
+        """Schedule a per-address probe and return a future resolving to its JSON"""
+        self._ensure_started()
+        coro = probe_ssl_addresses(domain, port, timeout, limiter=self._limited)
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def submit_sweep(self, domain: str, ports: Optional[List[int]] = None, timeout: float = SSL_TIMEOUT) -> Future:
+        """Schedule a multi-port sweep and return a future resolving to its JSON"""
+        self._ensure_started()
+        coro = probe_tls_sweep(domain, ports, timeout, limiter=self._limited)
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def check_many(self, domains: List[str], port: int = SSL_PORT, timeout: float = SSL_TIMEOUT,
+                   include_der: bool = False) -> Dict[str, str]:
+        """Probe all domains concurrently and return SSL JSON keyed by domain"""
+        futures = {domain: self.submit(domain, port, timeout, include_der) for domain in domains}
+        return {domain: future.result() for domain, future in futures.items()}
+
+# Global SSL probe engine instance
+ssl_probe_engine = SSLProbeEngine()
+
+def check_ssl_bulk(domains: List[str], include_der: bool = False) -> Dict[str, str]:
+    """
+    Check SSL certificates for many domains concurrently
+    """
+    return ssl_probe_engine.check_many(domains, include_der=include_der)
+
+def check_ssl_all_addresses(domain: str, port: int = SSL_PORT) -> str:
+    """
+    Check the SSL certificate on every address of a domain in parallel
+    """
+    return ssl_probe_engine.submit_addresses(domain, port).result()
+
+def check_tls_sweep(domain: str, ports: Optional[List[int]] = None) -> str:
+    """
+    Check TLS certificates on a set of ports (443, 465, 587 STARTTLS, ...) concurrently
+    """
+    return ssl_probe_engine.submit_sweep(domain, ports).result()
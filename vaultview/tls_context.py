@@ -0,0 +1,120 @@
+import ssl
+import socket
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Optional
+
+TLS_PHASES = ('context', 'connect', 'handshake')
+DEFAULT_MAX_SESSIONS = 2048
+
+class TLSContextManager:
+    """Shares one verifying SSL context and a per-host TLS session cache across threads"""
+
+    def __init__(self, max_sessions: int = DEFAULT_MAX_SESSIONS):
+        self.max_sessions = max_sessions
+        self._context = None
+        self._lock = threading.Lock()
+        self._sessions = OrderedDict()
+        self._phase_stats = {phase: {'count': 0, 'total_ms': 0.0} for phase in TLS_PHASES}
+        self._sessions_offered = 0
+        self._sessions_reused = 0
+
+    def get_context(self) -> ssl.SSLContext:
+        """Return the shared verifying context, loading the CA store on first use"""
+        if self._context is None:
+            with self._lock:
+                if self._context is None:
+                    start = time.perf_counter()
+                    self._context = ssl.create_default_context()
+                    elapsed = time.perf_counter() - start
+                else:
+                    elapsed = None
+            if elapsed is not None:
+                self.record_phase('context', elapsed)
+        return self._context
+
+    def get_session(self, host: str, port: int) -> Optional[ssl.SSLSession]:
+        """Get a cached TLS session for a host"""
+        with self._lock:
+            session = self._sessions.get((host, port))
+            if session is not None:
+                self._sessions.move_to_end((host, port))
+            return session
+
+    def store_session(self, host: str, port: int, session: Optional[ssl.SSLSession]):
+        """Cache a TLS session for a host, evicting the least recently used"""
+        if session is None:
+            return
+        with self._lock:
+            self._sessions[(host, port)] = session
+            self._sessions.move_to_end((host, port))
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+
+    def record_phase(self, phase: str, seconds: float):
+        """Record the time spent in one probe phase"""
+        with self._lock:
+            stats = self._phase_stats[phase]
+            stats['count'] += 1
+            stats['total_ms'] += seconds * 1000
+
+    def connect(self, host: str, port: int, timeout: float = 10, server_hostname: Optional[str] = None) -> ssl.SSLSocket:
+        """
+        Open a verified TLS connection, resuming a cached session when possible
+        """
+        server_hostname = server_hostname or host
+        self.get_context()
+
+        start = time.perf_counter()
+        sock = socket.create_connection((host, port), timeout=timeout)
+        self.record_phase('connect', time.perf_counter() - start)
+
+        try:
+            ssock = self.wrap_socket(sock, server_hostname, port)
+        except Exception:
+            sock.close()
+            raise
+
+        return ssock
+
+    def wrap_socket(self, sock: socket.socket, server_hostname: str, port: int) -> ssl.SSLSocket:
+        """
+        Run the TLS handshake on a connected socket using the shared context
+        """
+        session = self.get_session(server_hostname, port)
+
+        start = time.perf_counter()
+        ssock = self.get_context().wrap_socket(sock, server_hostname=server_hostname, session=session)
+        self.record_phase('handshake', time.perf_counter() - start)
+
+        with self._lock:
+            if session is not None:
+                self._sessions_offered += 1
+                if ssock.session_reused:
+                    self._sessions_reused += 1
+
+        self.store_session(server_hostname, port, ssock.session)
+        return ssock
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get per-phase timings and session cache counters"""
+        with self._lock:
+            phases = {}
+            for phase, stats in self._phase_stats.items():
+                phases[phase] = {
+                    'count': stats['count'],
+                    'total_ms': round(stats['total_ms'], 2),
+                    'avg_ms': round(stats['total_ms'] / stats['count'], 2) if stats['count'] else 0
+                }
+
+            return {
+                'context_loaded': self._context is not None,
+                'phases': phases,
+                'sessions_cached': len(self._sessions),
+                'sessions_offered': self._sessions_offered,
+                'sessions_reused': self._sessions_reused
+            }
+
+# Global TLS context manager instance
+tls_context_manager = TLSContextManager()
@@ -0,0 +1,23 @@
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+import whois
+
+# WHOIS query timeout (seconds)
+WHOIS_TIMEOUT = 10
+# Lookups that may run at once, including ones still hanging after their caller gave up
+MAX_WHOIS_WORKERS = 16
+
+# whois.whois() takes no timeout, so lookups run on their own pool and each caller
+# stops waiting at its own deadline, without touching process-wide socket settings
+_whois_executor = ThreadPoolExecutor(max_workers=MAX_WHOIS_WORKERS, thread_name_prefix='whois')
+
+def lookup_whois(domain: str, timeout: float = WHOIS_TIMEOUT):
+    """
+    Run a WHOIS query, raising TimeoutError if it has not answered within timeout seconds
+    """
+    future = _whois_executor.submit(whois.whois, domain)
+    try:
+        return future.result(timeout=timeout)
+    except FutureTimeoutError:
+        # A lookup still queued behind hung ones is dropped rather than run late
+        future.cancel()
+        raise TimeoutError(f'WHOIS lookup timed out after {timeout:g} seconds')
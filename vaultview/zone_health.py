@@ -0,0 +1,118 @@
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Any, Optional
+
+# Consecutive errors/timeouts that open a zone's circuit
+FAILURE_THRESHOLD = 3
+# Seconds an open circuit skips the zone before a half-open trial
+COOLDOWN = 300
+MAX_COOLDOWN = 3600
+# Seconds a half-open trial may stay unanswered before another trial is let through
+TRIAL_TIMEOUT = 120
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+class ZoneHealth:
+    """Circuit breaker state of one DNSBL zone"""
+
+    def __init__(self, zone: str):
+        self.zone = zone
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.cooldown = COOLDOWN
+        self.open_until = 0.0
+        self.queries = 0
+        self.failures = 0
+        self.skipped = 0
+        self.last_error = None
+        self.last_success = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'zone': self.zone,
+            'state': self.state,
+            'consecutive_failures': self.consecutive_failures,
+            'queries': self.queries,
+            'failures': self.failures,
+            'skipped': self.skipped,
+            'last_error': self.last_error,
+            'last_success': self.last_success,
+            'retry_in': max(0, round(self.open_until - time.monotonic())) if self.state == OPEN else 0
+        }
+
+class ZoneHealthTracker:
+    """Skips DNSBL zones that keep failing, probing them again after a cool-down"""
+
+    def __init__(self, failure_threshold: int = FAILURE_THRESHOLD, cooldown: float = COOLDOWN):
+        self.failure_threshold = failure_threshold
+        self.base_cooldown = cooldown
+        self._zones = {}
+        self._lock = threading.Lock()
+
+    def _get(self, zone: str) -> ZoneHealth:
+        health = self._zones.get(zone)
+        if health is None:
+            health = self._zones[zone] = ZoneHealth(zone)
+            health.cooldown = self.base_cooldown
+        return health
+
+    def allow(self, zone: str) -> bool:
+        """
+        Check whether a zone may be queried; an expired open circuit (or a trial that never
+        reported back) lets one trial query through
+        """
+        with self._lock:
+            health = self._get(zone)
+            if health.state == CLOSED:
+                return True
+            now = time.monotonic()
+            if now >= health.open_until:
+                health.state = HALF_OPEN
+                health.open_until = now + TRIAL_TIMEOUT
+                return True
+            health.skipped += 1
+            return False
+
+    def record_success(self, zone: str):
+        """Record an answer (listed or clean) from a zone, closing its circuit"""
+        with self._lock:
+            health = self._get(zone)
+            health.queries += 1
+            health.consecutive_failures = 0
+            health.state = CLOSED
+            health.cooldown = self.base_cooldown
+            health.last_success = datetime.now().isoformat()
+
+    def record_failure(self, zone: str, error: str):
+        """Record an error or timeout from a zone, opening its circuit when it keeps failing"""
+        with self._lock:
+            health = self._get(zone)
+            health.queries += 1
+            health.failures += 1
+            health.consecutive_failures += 1
+            health.last_error = error
+
+            if health.state == HALF_OPEN:
+                # Trial failed: stay away longer this time
+                health.cooldown = min(health.cooldown * 2, MAX_COOLDOWN)
+                self._open(health)
+            elif health.consecutive_failures >= self.failure_threshold:
+                self._open(health)
+
+    def _open(self, health: ZoneHealth):
+        health.state = OPEN
+        health.open_until = time.monotonic() + health.cooldown
+        print(f"DNSBL zone {health.zone} marked unhealthy for {health.cooldown:g}s: {health.last_error}")
+
+    def get_status(self, zone: Optional[str] = None) -> Dict[str, Any]:
+        """Get the health of one zone or of every zone seen so far"""
+        with self._lock:
+            if zone is not None:
+                return self._get(zone).to_dict()
+            return {name: health.to_dict() for name, health in self._zones.items()}
+
+# Global zone health tracker instance
+zone_health = ZoneHealthTracker()